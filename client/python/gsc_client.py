@@ -1,20 +1,36 @@
 import requests
 import json
-from datetime import datetime, date
-from typing import Dict, List, Optional, Any
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, date, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Any
 from urllib.parse import urljoin
 
+# Statuts HTTP pour lesquels une nouvelle tentative a du sens
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+
 class GSCConnectorClient:
-    def __init__(self, base_url: str = "http://localhost:8021", api_key: str = None):
+    def __init__(self, base_url: str = "http://localhost:8021", api_key: str = None,
+                 compact: bool = True, etag_cache_size: int = 256):
         """
         Client pour le microservice GSC Connector
         
         Args:
             base_url: URL de base du microservice (ex: http://localhost:8021)
             api_key: Clé API pour l'authentification
+            compact: Demande le layout "columns" des métriques (décodé automatiquement)
+            etag_cache_size: Nombre de réponses gardées pour les requêtes conditionnelles (0 = désactivé)
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
+        self.compact = compact
+        self.etag_cache_size = etag_cache_size
+        self._etag_cache: Dict[str, Any] = {}
+        self._etag_lock = threading.Lock()
         self.session = requests.Session()
         
         if api_key:
@@ -23,22 +39,46 @@ class GSCConnectorClient:
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict:
         """Effectue une requête HTTP avec gestion d'erreur"""
         url = urljoin(self.base_url + '/', endpoint.lstrip('/'))
+        cache_key = None
+        cached = None
+        
+        if method == 'GET' and self.etag_cache_size > 0:
+            cache_key = url + '?' + json.dumps(kwargs.get('params') or {}, sort_keys=True)
+            with self._etag_lock:
+                cached = self._etag_cache.get(cache_key)
+            if cached:
+                kwargs['headers'] = {**(kwargs.get('headers') or {}), 'If-None-Match': cached[0]}
         
         try:
             response = self.session.request(method, url, **kwargs)
+            if response.status_code == 304 and cache_key and cached:
+                return _decode_columns(cached[1])
             response.raise_for_status()
-            return response.json()
+            payload = response.json()
+            
+            etag = response.headers.get('ETag')
+            if cache_key and etag:
+                with self._etag_lock:
+                    self._etag_cache.pop(cache_key, None)
+                    self._etag_cache[cache_key] = (etag, payload)
+                    while len(self._etag_cache) > self.etag_cache_size:
+                        self._etag_cache.pop(next(iter(self._etag_cache)))
+            
+            return _decode_columns(payload)
         except requests.exceptions.RequestException as e:
-            if hasattr(e.response, 'json'):
+            response = getattr(e, 'response', None)
+            if response is not None:
+                retry_after = _parse_retry_after(response.headers.get('Retry-After'))
                 try:
-                    error_data = e.response.json()
-                    raise GSCConnectorError(
-                        error_data.get('message', str(e)),
-                        error_data.get('error', 'unknown_error'),
-                        e.response.status_code
-                    )
+                    error_data = response.json()
                 except ValueError:
-                    pass
+                    error_data = {}
+                raise GSCConnectorError(
+                    error_data.get('message', str(e)),
+                    error_data.get('error', 'unknown_error'),
+                    response.status_code,
+                    retry_after
+                )
             raise GSCConnectorError(f"Erreur de requête: {str(e)}")
 
     # Méthodes d'authentification
@@ -84,6 +124,136 @@ class GSCConnectorClient:
             filters: Filtres optionnels
             dry_run: Mode simulation
         """
+        data = self._build_import_payload(property_url, start_date, end_date, dimensions,
+                                          search_type, data_state, filters, dry_run)
+        return self._make_request('POST', '/gsc/import', json=data)
+
+    def import_range(self,
+                     property_url: str,
+                     start_date: str,
+                     end_date: str,
+                     chunk_days: int = 1,
+                     max_workers: int = 3,
+                     max_retries: int = 5,
+                     backoff: float = 2.0,
+                     progress_callback: Optional[Callable[[Dict], None]] = None,
+                     state_file: Optional[str] = None,
+                     timeout: float = 600,
+                     dimensions: Optional[List[str]] = None,
+                     search_type: str = 'web',
+                     data_state: str = 'all',
+                     filters: Optional[Dict] = None) -> Dict:
+        """
+        Import d'une longue période découpée en tranches importées en parallèle
+        
+        Chaque tranche est un appel /gsc/import indépendant : une erreur 429/5xx ou réseau
+        est retentée avec un backoff exponentiel qui respecte l'en-tête Retry-After.
+        Les tranches terminées sont enregistrées dans state_file pour qu'une relance les saute.
+        
+        Args:
+            property_url: URL de la propriété GSC
+            start_date: Date de début (YYYY-MM-DD)
+            end_date: Date de fin (YYYY-MM-DD)
+            chunk_days: Taille d'une tranche en jours (1 = jour, 7 = semaine)
+            max_workers: Nombre de tranches importées simultanément
+            max_retries: Nombre maximum de nouvelles tentatives par tranche
+            backoff: Délai de base (secondes) du backoff exponentiel
+            progress_callback: Appelée avec un dict à chaque changement d'état d'une tranche
+            state_file: Fichier JSON des tranches terminées (reprise)
+            timeout: Timeout HTTP d'une tranche (secondes)
+            dimensions, search_type, data_state, filters: voir import_data
+        """
+        start = datetime.strptime(self.format_date(start_date), '%Y-%m-%d').date()
+        end = datetime.strptime(self.format_date(end_date), '%Y-%m-%d').date()
+        if end < start:
+            raise ValueError("end_date doit être postérieure ou égale à start_date")
+        if chunk_days < 1:
+            raise ValueError("chunk_days doit être supérieur ou égal à 1")
+        if max_workers < 1:
+            raise ValueError("max_workers doit être supérieur ou égal à 1")
+
+        chunks = []
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+            chunks.append((chunk_start.isoformat(), chunk_end.isoformat()))
+            chunk_start = chunk_end + timedelta(days=1)
+
+        scope = json.dumps([property_url, dimensions, search_type, data_state, filters], sort_keys=True)
+        state = _ImportState(state_file, scope)
+        pending = [chunk for chunk in chunks if not state.is_done(chunk)]
+
+        lock = threading.Lock()
+        summary = {
+            'status': 'completed',
+            'chunks_total': len(chunks),
+            'chunks_completed': 0,
+            'chunks_skipped': len(chunks) - len(pending),
+            'rows_imported': 0,
+            'failed': []
+        }
+
+        def notify(chunk, status, **extra):
+            if progress_callback is None:
+                return
+            with lock:
+                done = summary['chunks_completed'] + summary['chunks_skipped']
+                event = {
+                    'start': chunk[0],
+                    'end': chunk[1],
+                    'status': status,
+                    'done': done,
+                    'total': summary['chunks_total'],
+                    'rows_imported': summary['rows_imported'],
+                    **extra
+                }
+            progress_callback(event)
+
+        for chunk in chunks:
+            if state.is_done(chunk):
+                notify(chunk, 'skipped')
+
+        def run_chunk(chunk):
+            payload = self._build_import_payload(property_url, chunk[0], chunk[1], dimensions,
+                                                 search_type, data_state, filters, False)
+            attempt = 0
+            while True:
+                try:
+                    return self._make_request('POST', '/gsc/import', json=payload, timeout=timeout)
+                except GSCConnectorError as e:
+                    if not e.retryable or attempt >= max_retries:
+                        raise
+                    delay = e.retry_after if e.retry_after is not None \
+                        else backoff * (2 ** attempt) + random.uniform(0, backoff)
+                    attempt += 1
+                    notify(chunk, 'retrying', attempt=attempt, delay=delay, error=str(e))
+                    time.sleep(delay)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run_chunk, chunk): chunk for chunk in pending}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except GSCConnectorError as e:
+                    with lock:
+                        summary['failed'].append({'start': chunk[0], 'end': chunk[1],
+                                                  'error': e.error_code or str(e), 'message': str(e)})
+                    notify(chunk, 'failed', error=str(e))
+                    continue
+
+                with lock:
+                    summary['chunks_completed'] += 1
+                    summary['rows_imported'] += result.get('rowsImported', 0) or 0
+                    state.mark_done(chunk)
+                notify(chunk, 'completed', rows=result.get('rowsImported', 0))
+
+        if summary['failed']:
+            summary['status'] = 'partial'
+        return summary
+
+    def _build_import_payload(self, property_url, start_date, end_date, dimensions,
+                              search_type, data_state, filters, dry_run) -> Dict:
         data = {
             'property': property_url,
             'start': start_date,
@@ -98,7 +268,7 @@ class GSCConnectorClient:
         if filters:
             data['filters'] = filters
 
-        return self._make_request('POST', '/gsc/import', json=data)
+        return data
 
     # Méthodes de métriques
     def get_url_metrics(self,
@@ -107,7 +277,8 @@ class GSCConnectorClient:
                        end_date: str,
                        site_url: Optional[str] = None,
                        country: Optional[str] = None,
-                       device: Optional[str] = None) -> Dict:
+                       device: Optional[str] = None,
+                       granularity: str = 'day') -> Dict:
         """
         Récupère les métriques pour une URL
         
@@ -118,6 +289,7 @@ class GSCConnectorClient:
             site_url: URL du site (optionnel, déduit automatiquement)
             country: Code pays (optionnel)
             device: Type d'appareil (optionnel)
+            granularity: Pas de la série temporelle ('day', 'week', 'month')
         """
         params = {
             'url': url,
@@ -131,6 +303,10 @@ class GSCConnectorClient:
             params['country'] = country
         if device:
             params['device'] = device
+        if granularity != 'day':
+            params['granularity'] = granularity
+        if self.compact:
+            params['format'] = 'columns'
 
         return self._make_request('GET', '/metrics/url', params=params)
 
@@ -163,9 +339,51 @@ class GSCConnectorClient:
             'orderBy': order_by,
             'order': order
         }
+        if self.compact:
+            params['format'] = 'columns'
 
         return self._make_request('GET', '/metrics/urls', params=params)
 
+    def compare_url_periods(self,
+                            site_url: str,
+                            start_date: str,
+                            end_date: str,
+                            compare_start_date: str,
+                            compare_end_date: str,
+                            limit: int = 100,
+                            order_by: str = 'clicks_delta',
+                            order: str = 'desc',
+                            cursor: Optional[str] = None) -> Dict:
+        """
+        Compare les métriques par URL entre deux périodes (un seul parcours côté serveur)
+        
+        Args:
+            site_url: URL du site
+            start_date: Début de la période analysée
+            end_date: Fin de la période analysée
+            compare_start_date: Début de la période de référence
+            compare_end_date: Fin de la période de référence
+            limit: Nombre de résultats (max 1000)
+            order_by: Tri par ('clicks_delta', 'impressions_delta', 'ctr_delta',
+                      'position_delta', 'clicks', 'impressions')
+            order: 'desc' pour les plus fortes hausses, 'asc' pour les plus fortes baisses
+            cursor: Valeur pagination.next_cursor de la page précédente
+        """
+        params = {
+            'siteUrl': site_url,
+            'start': start_date,
+            'end': end_date,
+            'compareStart': compare_start_date,
+            'compareEnd': compare_end_date,
+            'limit': limit,
+            'orderBy': order_by,
+            'order': order
+        }
+        if cursor:
+            params['cursor'] = cursor
+
+        return self._make_request('GET', '/metrics/urls/compare', params=params)
+
     # Méthodes de santé
     def health_check(self) -> Dict:
         """Vérifie la santé du service"""
@@ -190,7 +408,72 @@ class GSCConnectorClient:
 
 class GSCConnectorError(Exception):
     """Exception personnalisée pour les erreurs du GSC Connector"""
-    def __init__(self, message: str, error_code: str = None, status_code: int = None):
+    def __init__(self, message: str, error_code: str = None, status_code: int = None,
+                 retry_after: Optional[float] = None):
         super().__init__(message)
         self.error_code = error_code
-        self.status_code = status_code
\ No newline at end of file
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        """Vrai pour un rate limit, une indisponibilité ou une erreur réseau (pas de statut)"""
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS_CODES
+
+
+def _decode_columns(payload: Any) -> Any:
+    """Reconvertit le layout "columns" (un tableau par champ) en liste de dicts"""
+    data = payload.get('data') if isinstance(payload, dict) else None
+    if not isinstance(data, dict) or data.get('meta', {}).get('layout') != 'columns':
+        return payload
+
+    decoded = dict(data)
+    for key in ('timeseries', 'urls'):
+        columns = data.get(key)
+        if isinstance(columns, dict):
+            fields = list(columns)
+            size = len(columns[fields[0]]) if fields else 0
+            decoded[key] = [{field: columns[field][i] for field in fields} for i in range(size)]
+    decoded['meta'] = {**data['meta'], 'layout': 'rows'}
+    return {**payload, 'data': decoded}
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _ImportState:
+    """Tranches déjà importées par import_range, persistées en JSON"""
+    def __init__(self, path: Optional[str], scope: str):
+        self.path = path
+        self.scope = scope
+        self.done = set()
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('scope') == scope:
+                self.done = {tuple(chunk) for chunk in data.get('completed', [])}
+
+    def is_done(self, chunk) -> bool:
+        return chunk in self.done
+
+    def mark_done(self, chunk):
+        self.done.add(chunk)
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'scope': self.scope, 'completed': sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
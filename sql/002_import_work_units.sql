@@ -0,0 +1,32 @@
+-- Import work units: one row per (property, date) claimed by workers through leases
+
+CREATE TABLE IF NOT EXISTS import_work_units (
+    id SERIAL PRIMARY KEY,
+    job_id INTEGER NOT NULL REFERENCES import_jobs(id) ON DELETE CASCADE,
+    site_url VARCHAR(500) NOT NULL,
+    date DATE NOT NULL,
+    dimensions TEXT NOT NULL,
+    search_type VARCHAR(20) NOT NULL DEFAULT 'web',
+    data_state VARCHAR(10) NOT NULL DEFAULT 'all',
+    filters TEXT NOT NULL DEFAULT '{}',
+    scope_key VARCHAR(40) NOT NULL DEFAULT '',
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id VARCHAR(255),
+    lease_expires_at TIMESTAMP WITH TIME ZONE,
+    available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    rows_imported INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_import_work_units_job_date ON import_work_units(job_id, date);
+CREATE INDEX IF NOT EXISTS idx_import_work_units_claim ON import_work_units(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_import_work_units_site_status ON import_work_units(site_url, status);
+
+-- Two replicas must never import the same property/day concurrently for the same scope
+-- (scope_key = hash of dimensions + filters, so a filtered import never swallows a full one)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_import_work_units_active
+    ON import_work_units(site_url, date, search_type, data_state, scope_key)
+    WHERE status IN ('pending', 'running');
@@ -0,0 +1,42 @@
+-- Weekly / monthly rollups of gsc_url_daily for long date ranges
+-- position_weighted = SUM(position * impressions) so buckets recombine into an exact weighted average
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS gsc_url_weekly AS
+SELECT
+    site_url,
+    date_trunc('week', date)::date as week_start,
+    page_normalized,
+    SUM(total_clicks) as total_clicks,
+    SUM(total_impressions) as total_impressions,
+    SUM(avg_position * total_impressions) as position_weighted,
+    COUNT(*) as days_with_data,
+    MAX(date) as last_date
+FROM gsc_url_daily
+GROUP BY site_url, date_trunc('week', date)::date, page_normalized;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_gsc_url_weekly_unique ON gsc_url_weekly(site_url, week_start, page_normalized);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS gsc_url_monthly AS
+SELECT
+    site_url,
+    date_trunc('month', date)::date as month_start,
+    page_normalized,
+    SUM(total_clicks) as total_clicks,
+    SUM(total_impressions) as total_impressions,
+    SUM(avg_position * total_impressions) as position_weighted,
+    COUNT(*) as days_with_data,
+    MAX(date) as last_date
+FROM gsc_url_daily
+GROUP BY site_url, date_trunc('month', date)::date, page_normalized;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_gsc_url_monthly_unique ON gsc_url_monthly(site_url, month_start, page_normalized);
+
+-- Rollups are refreshed right after the daily view they are built from
+CREATE OR REPLACE FUNCTION refresh_gsc_url_daily()
+RETURNS void AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY gsc_url_daily;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY gsc_url_weekly;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY gsc_url_monthly;
+END;
+$$ LANGUAGE plpgsql;
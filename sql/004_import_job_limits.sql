@@ -0,0 +1,5 @@
+-- Per-job lease limit derived from the import estimate (recommendedConcurrency)
+-- NULL = only IMPORT_MAX_LEASES_PER_PROPERTY applies
+
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS max_leases INTEGER;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS estimated_rows BIGINT;
@@ -19,6 +19,8 @@ const requestLogger = require('./middleware/requestLogger');
 const { errorHandler, notFoundHandler } = require('./middleware/errorHandler');
 const { validateIpWhitelist } = require('./middleware/auth');
 const { cacheMiddleware } = require('./middleware/cache');
+const { compressResponse } = require('./middleware/compression');
+const { conditionalGet } = require('./middleware/conditional');
 const { createLogger } = require('./utils/logger');
 
 const authRoutes = require('./routes/auth');
@@ -26,6 +28,7 @@ const gscRoutes = require('./routes/gsc');
 const metricsRoutes = require('./routes/metrics');
 const healthRoutes = require('./routes/health-simple');
 const docsRoutes = require('./routes/docs');
+const adminRoutes = require('./routes/admin');
 
 const logger = createLogger('App');
 
@@ -77,8 +80,12 @@ class GSCConnectorApp {
           `GET ${this.basePath}/gsc/properties - List GSC properties`,
           `GET ${this.basePath}/gsc/check-access - Check property access`,
           `POST ${this.basePath}/gsc/import - Import GSC data`,
+          `GET ${this.basePath}/gsc/import/:jobId - Queued import progress`,
           `GET ${this.basePath}/metrics/url - Get URL metrics`,
-          `GET ${this.basePath}/metrics/urls - List URLs with metrics`
+          `GET ${this.basePath}/metrics/urls - List URLs with metrics`,
+          `GET ${this.basePath}/metrics/urls/compare - Compare URL metrics between two periods`,
+          `POST ${this.basePath}/admin/profile/cpu - Capture a CPU profile (API key)`,
+          `POST ${this.basePath}/admin/profile/heap - Capture a heap snapshot (API key)`
         ]
       });
     });
@@ -89,7 +96,9 @@ class GSCConnectorApp {
 
     this.app.use(this.basePath + '/auth', authRoutes);
     this.app.use(this.basePath + '/gsc', gscRoutes);
-    this.app.use(this.basePath + '/metrics', cacheMiddleware(), metricsRoutes);
+    // compressResponse doit envelopper res.send avant cacheMiddleware (qui relit le JSON)
+    this.app.use(this.basePath + '/metrics', compressResponse(), conditionalGet(), cacheMiddleware(), metricsRoutes);
+    this.app.use(this.basePath + '/admin', adminRoutes);
 
     this.app.use('*', notFoundHandler);
   }
@@ -153,6 +162,12 @@ class GSCConnectorApp {
       this.setupRoutes();
       this.setupErrorHandling();
 
+      if (process.env.IMPORT_WORKER_EMBEDDED === 'true') {
+        const ImportWorker = require('./services/importWorker');
+        this.importWorker = new ImportWorker();
+        this.importWorker.start();
+      }
+
       this.server = this.app.listen(this.port, () => {
         logger.info(`GSC Connector listening on port ${this.port}`);
         logger.info(`Environment: ${process.env.NODE_ENV || 'development'}`);
@@ -179,6 +194,11 @@ class GSCConnectorApp {
         logger.info('HTTP server closed');
 
         try {
+          if (this.importWorker) {
+            await this.importWorker.stop();
+            logger.info('Import worker stopped');
+          }
+
           await db.close();
           logger.info('Database connection closed');
 
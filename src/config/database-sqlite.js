@@ -124,6 +124,8 @@ class SQLiteDatabase {
           await this.query(statement);
         }
       }
+
+      await this.addMissingColumns();
       
       console.log('SQLite database schema initialized successfully');
     } catch (error) {
@@ -132,6 +134,24 @@ class SQLiteDatabase {
     }
   }
 
+  // CREATE TABLE IF NOT EXISTS ne modifie pas une base existante : colonnes ajoutées après coup
+  async addMissingColumns() {
+    const columns = [
+      ['import_jobs', 'max_leases', 'INTEGER'],
+      ['import_jobs', 'estimated_rows', 'INTEGER']
+    ];
+
+    for (const [table, column, type] of columns) {
+      try {
+        await this.query(`ALTER TABLE ${table} ADD COLUMN ${column} ${type}`);
+      } catch (error) {
+        if (!/duplicate column name/i.test(error.message)) {
+          throw error;
+        }
+      }
+    }
+  }
+
   getDefaultSchema() {
     return `
       -- Table pour les comptes OAuth
@@ -196,9 +216,39 @@ class SQLiteDatabase {
         status TEXT DEFAULT 'pending',
         rows_imported INTEGER DEFAULT 0,
         error_message TEXT,
+        max_leases INTEGER,
+        estimated_rows INTEGER,
         started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
         completed_at DATETIME
       );
+
+      -- Table pour les unités de travail d'import (leases)
+      CREATE TABLE IF NOT EXISTS import_work_units (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id INTEGER NOT NULL,
+        site_url TEXT NOT NULL,
+        date TEXT NOT NULL,
+        dimensions TEXT NOT NULL,
+        search_type TEXT DEFAULT 'web',
+        data_state TEXT DEFAULT 'all',
+        filters TEXT DEFAULT '{}',
+        scope_key TEXT DEFAULT '',
+        status TEXT DEFAULT 'pending',
+        attempts INTEGER DEFAULT 0,
+        worker_id TEXT,
+        lease_expires_at TEXT,
+        available_at TEXT NOT NULL,
+        rows_imported INTEGER DEFAULT 0,
+        error_message TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        completed_at DATETIME,
+        UNIQUE(job_id, date)
+      );
+
+      CREATE INDEX IF NOT EXISTS idx_import_work_units_claim ON import_work_units(status, available_at);
+      CREATE UNIQUE INDEX IF NOT EXISTS idx_import_work_units_active
+        ON import_work_units(site_url, date, search_type, data_state, scope_key)
+        WHERE status IN ('pending', 'running');
     `;
   }
 
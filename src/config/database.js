@@ -56,15 +56,26 @@ if (dbType === 'sqlite') {
     }
 
     async initializeSchema() {
-      const schemaPath = path.join(__dirname, '../../sql/001_initial_schema.sql');
-      const schemaSql = fs.readFileSync(schemaPath, 'utf8');
-      
-      try {
-        await this.query(schemaSql);
-        console.log('Database schema initialized successfully');
-      } catch (error) {
-        console.error('Failed to initialize database schema:', error.message);
-        throw error;
+      const sqlDir = path.join(__dirname, '../../sql');
+      const migrations = fs.readdirSync(sqlDir)
+        .filter(file => /^\d+_.*\.sql$/.test(file))
+        .sort();
+
+      for (const file of migrations) {
+        const schemaSql = fs.readFileSync(path.join(sqlDir, file), 'utf8');
+
+        try {
+          await this.query(schemaSql);
+          console.log(`Database schema ${file} applied successfully`);
+        } catch (error) {
+          // 42P07 duplicate_table / 42710 duplicate_object: schema déjà appliqué
+          if (error.code === '42P07' || error.code === '42710') {
+            console.log(`Database schema ${file} already applied`);
+            continue;
+          }
+          console.error(`Failed to initialize database schema ${file}:`, error.message);
+          throw error;
+        }
       }
     }
 
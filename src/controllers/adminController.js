@@ -0,0 +1,70 @@
+const path = require('path');
+const Joi = require('joi');
+const profiler = require('../services/profiler');
+const { createLogger } = require('../utils/logger');
+
+const logger = createLogger('AdminController');
+
+const cpuProfileSchema = Joi.object({
+  duration: Joi.number().integer().min(1).max(120).default(10)
+});
+
+class AdminController {
+  async captureCpuProfile(req, res) {
+    try {
+      const { error, value } = cpuProfileSchema.validate(req.query, { allowUnknown: true });
+
+      if (error) {
+        return res.status(400).json({
+          success: false,
+          error: 'validation_error',
+          message: error.details[0].message,
+          request_id: req.requestId
+        });
+      }
+
+      const profile = await profiler.captureCpuProfile(value.duration * 1000);
+      this.sendProfile(req, res, profile);
+    } catch (error) {
+      logger.error('CPU profile capture failed', { error: error.message, requestId: req.requestId });
+
+      this.handleError(req, res, error);
+    }
+  }
+
+  async captureHeapSnapshot(req, res) {
+    try {
+      const snapshot = await profiler.captureHeapSnapshot();
+      this.sendProfile(req, res, snapshot);
+    } catch (error) {
+      logger.error('Heap snapshot failed', { error: error.message, requestId: req.requestId });
+
+      this.handleError(req, res, error);
+    }
+  }
+
+  // Le fichier reste aussi sur disque (PROFILE_DIR) pour une analyse ultérieure
+  sendProfile(req, res, profile) {
+    res.set('X-Profile-File', path.basename(profile.file));
+    res.download(profile.file, path.basename(profile.file), (error) => {
+      if (error && !res.headersSent) {
+        this.handleError(req, res, error);
+      }
+    });
+  }
+
+  handleError(req, res, error) {
+    const message = error.message || 'Unknown error';
+    const statusCode = message.includes('profile_in_progress') ? 409 : 500;
+    const errorCode = statusCode === 409 ? 'profile_in_progress' : 'internal_error';
+
+    res.status(statusCode).json({
+      success: false,
+      error: errorCode,
+      message: message,
+      request_id: req.requestId || 'unknown'
+    });
+  }
+}
+
+module.exports = new AdminController();
@@ -1,5 +1,6 @@
 const gscService = require('../services/gscService');
 const { createLogger } = require('../utils/logger');
+const { measureSync } = require('../utils/timing');
 const Joi = require('joi');
 
 const logger = createLogger('GSCController');
@@ -16,7 +17,8 @@ const importSchema = Joi.object({
     device: Joi.string().valid('desktop', 'mobile', 'tablet'),
     pageRegex: Joi.string()
   }).default({}),
-  dryRun: Joi.boolean().default(false)
+  dryRun: Joi.boolean().default(false),
+  queue: Joi.boolean().default(false)
 });
 
 class GSCController {
@@ -37,7 +39,7 @@ class GSCController {
     } catch (error) {
       logger.error('Failed to get properties', { error: error.message });
       
-      this.handleError(res, error);
+      this.handleError(req, res, error);
     }
   }
 
@@ -64,13 +66,13 @@ class GSCController {
     } catch (error) {
       logger.error('Failed to check access', { error: error.message, property: req.query.property });
       
-      this.handleError(res, error);
+      this.handleError(req, res, error);
     }
   }
 
   async importData(req, res) {
     try {
-      const { error, value } = importSchema.validate(req.body);
+      const { error, value } = measureSync('validate', () => importSchema.validate(req.body));
       
       if (error) {
         return res.status(400).json({
@@ -84,18 +86,72 @@ class GSCController {
 
       const result = await gscService.importSearchAnalytics(value);
       
-      res.json({
+      res.status(result.status === 'queued' || result.status === 'already_queued' ? 202 : 200).json({
         success: true,
         ...result
       });
     } catch (error) {
       logger.error('Import failed', { error: error.message, params: req.body });
       
-      this.handleError(res, error);
+      this.handleError(req, res, error);
     }
   }
 
-  handleError(res, error) {
+  async getImportJob(req, res) {
+    try {
+      const jobId = parseInt(req.params.jobId);
+
+      if (!Number.isInteger(jobId)) {
+        return res.status(400).json({
+          success: false,
+          error: 'validation_error',
+          message: 'jobId must be an integer'
+        });
+      }
+
+      const result = await gscService.getImportJob(jobId);
+
+      if (!result) {
+        return res.status(404).json({
+          success: false,
+          error: 'job_not_found',
+          message: `Import job ${jobId} not found`
+        });
+      }
+
+      const { job, progress } = result;
+      // Les imports synchrones n'ont pas d'unités : le total est porté par le job lui-même
+      const rowsImported = progress.totalUnits > 0 ? progress.rowsImported : (parseInt(job.rows_imported) || 0);
+
+      res.json({
+        success: true,
+        job: {
+          id: job.id,
+          property: job.site_url,
+          start: job.start_date,
+          end: job.end_date,
+          status: job.status,
+          rows_imported: rowsImported,
+          error_message: job.error_message,
+          started_at: job.started_at,
+          completed_at: job.completed_at
+        },
+        progress: {
+          total: progress.totalUnits,
+          pending: progress.pendingUnits,
+          running: progress.runningUnits,
+          completed: progress.completedUnits,
+          failed: progress.failedUnits
+        }
+      });
+    } catch (error) {
+      logger.error('Failed to get import job', { error: error.message, jobId: req.params.jobId });
+
+      this.handleError(req, res, error);
+    }
+  }
+
+  handleError(req, res, error) {
     const message = error.message || 'Unknown error';
     let statusCode = 500;
     let errorCode = 'internal_error';
@@ -120,6 +176,13 @@ class GSCController {
       errorCode = 'validation_error';
     }
 
+    // Indique aux clients (import_range) quand relancer
+    if (statusCode === 429) {
+      res.set('Retry-After', String(parseInt(process.env.RATE_LIMIT_RETRY_AFTER_S) || 60));
+    } else if (statusCode === 503) {
+      res.set('Retry-After', '30');
+    }
+
     res.status(statusCode).json({
       success: false,
       error: errorCode,
@@ -1,6 +1,8 @@
 const SearchAnalytics = require('../models/SearchAnalytics');
 const { normalizeUrl } = require('../utils/urlNormalizer');
+const { toColumns } = require('../utils/columnar');
 const { createLogger } = require('../utils/logger');
+const { measureSync } = require('../utils/timing');
 const Joi = require('joi');
 
 const logger = createLogger('MetricsController');
@@ -11,13 +13,32 @@ const metricsSchema = Joi.object({
   end: Joi.date().iso().min(Joi.ref('start')).required(),
   country: Joi.string().length(3).optional(),
   device: Joi.string().valid('desktop', 'mobile', 'tablet').optional(),
-  siteUrl: Joi.string().optional()
+  siteUrl: Joi.string().optional(),
+  granularity: Joi.string().valid('day', 'week', 'month').default('day'),
+  format: Joi.string().valid('rows', 'columns').default('rows')
 });
 
+const compareSchema = Joi.object({
+  siteUrl: Joi.string().required(),
+  start: Joi.date().iso().required(),
+  end: Joi.date().iso().min(Joi.ref('start')).required(),
+  compareStart: Joi.date().iso().required(),
+  compareEnd: Joi.date().iso().min(Joi.ref('compareStart')).required(),
+  limit: Joi.number().integer().min(1).max(1000).default(100),
+  orderBy: Joi.string()
+    .valid('clicks_delta', 'impressions_delta', 'ctr_delta', 'position_delta', 'clicks', 'impressions')
+    .default('clicks_delta'),
+  order: Joi.string().valid('asc', 'desc').default('desc'),
+  cursor: Joi.string().optional()
+});
+
+const TIMESERIES_FIELDS = ['date', 'clicks', 'impressions', 'ctr', 'avg_position'];
+const URL_LIST_FIELDS = ['url', 'clicks', 'impressions', 'ctr', 'avg_position'];
+
 class MetricsController {
   async getUrlMetrics(req, res) {
     try {
-      const { error, value } = metricsSchema.validate(req.query);
+      const { error, value } = measureSync('validate', () => metricsSchema.validate(req.query));
       
       if (error) {
         return res.status(400).json({
@@ -27,7 +48,7 @@ class MetricsController {
         });
       }
 
-      const { url, start, end, country, device, siteUrl } = value;
+      const { url, start, end, country, device, siteUrl, granularity, format } = value;
       
       const targetSiteUrl = siteUrl || this.inferSiteUrl(url);
       if (!targetSiteUrl) {
@@ -46,6 +67,7 @@ class MetricsController {
         targetSiteUrl, 
         start, 
         end, 
+        granularity,
         filters: { country, device } 
       });
 
@@ -58,10 +80,18 @@ class MetricsController {
         normalizedUrl,
         start,
         end,
-        filters
+        filters,
+        granularity
       );
 
       const dataFreshnessNote = this.getDataFreshnessNote(data.totals.last_data_date);
+      const timeseries = measureSync('map', () => data.timeseries.map(row => ({
+        date: row.date.toISOString().split('T')[0],
+        clicks: parseInt(row.clicks),
+        impressions: parseInt(row.impressions),
+        ctr: parseFloat(row.ctr.toFixed(4)),
+        avg_position: parseFloat(row.avg_position.toFixed(2))
+      })));
 
       res.json({
         success: true,
@@ -73,13 +103,8 @@ class MetricsController {
             end: end
           },
           filters: filters,
-          timeseries: data.timeseries.map(row => ({
-            date: row.date.toISOString().split('T')[0],
-            clicks: parseInt(row.clicks),
-            impressions: parseInt(row.impressions),
-            ctr: parseFloat(row.ctr.toFixed(4)),
-            avg_position: parseFloat(row.avg_position.toFixed(2))
-          })),
+          granularity,
+          timeseries: format === 'columns' ? toColumns(timeseries, TIMESERIES_FIELDS) : timeseries,
           totals: {
             clicks: parseInt(data.totals.total_clicks) || 0,
             impressions: parseInt(data.totals.total_impressions) || 0,
@@ -90,7 +115,8 @@ class MetricsController {
             data_freshness_note: dataFreshnessNote,
             source: "GSC",
             last_updated: new Date().toISOString(),
-            days_with_data: data.timeseries.length
+            days_with_data: parseInt(data.totals.days_with_data) || data.timeseries.length,
+            layout: format
           }
         }
       });
@@ -118,10 +144,11 @@ class MetricsController {
         limit: Joi.number().integer().min(1).max(1000).default(100),
         offset: Joi.number().integer().min(0).default(0),
         orderBy: Joi.string().valid('clicks', 'impressions', 'ctr', 'position').default('clicks'),
-        order: Joi.string().valid('asc', 'desc').default('desc')
+        order: Joi.string().valid('asc', 'desc').default('desc'),
+        format: Joi.string().valid('rows', 'columns').default('rows')
       });
 
-      const { error, value } = schema.validate(req.query);
+      const { error, value } = measureSync('validate', () => schema.validate(req.query));
       
       if (error) {
         return res.status(400).json({
@@ -131,59 +158,33 @@ class MetricsController {
         });
       }
 
-      const { siteUrl, start, end, limit, offset, orderBy, order } = value;
-
-      const query = `
-        SELECT 
-          page_normalized as url,
-          SUM(total_clicks) as clicks,
-          SUM(total_impressions) as impressions,
-          CASE 
-            WHEN SUM(total_impressions) > 0 THEN SUM(total_clicks)::DOUBLE PRECISION / SUM(total_impressions)::DOUBLE PRECISION
-            ELSE 0
-          END as ctr,
-          CASE 
-            WHEN SUM(total_impressions) > 0 THEN SUM(avg_position * total_impressions) / SUM(total_impressions)
-            ELSE 0
-          END as avg_position
-        FROM gsc_url_daily
-        WHERE site_url = $1 AND date >= $2 AND date <= $3
-        GROUP BY page_normalized
-        ORDER BY ${orderBy} ${order.toUpperCase()}
-        LIMIT $4 OFFSET $5
-      `;
-
-      const countQuery = `
-        SELECT COUNT(DISTINCT page_normalized) as total
-        FROM gsc_url_daily
-        WHERE site_url = $1 AND date >= $2 AND date <= $3
-      `;
-
-      const [dataResult, countResult] = await Promise.all([
-        require('../config/database').query(query, [siteUrl, start, end, limit, offset]),
-        require('../config/database').query(countQuery, [siteUrl, start, end])
-      ]);
+      const { siteUrl, start, end, limit, offset, orderBy, order, format } = value;
+
+      const { rows, total } = await SearchAnalytics.listUrls(siteUrl, start, end, { limit, offset, orderBy, order });
+
+      const urls = measureSync('map', () => rows.map(row => ({
+        url: row.url,
+        clicks: parseInt(row.clicks),
+        impressions: parseInt(row.impressions),
+        ctr: parseFloat(row.ctr.toFixed(4)),
+        avg_position: parseFloat(row.avg_position.toFixed(2))
+      })));
 
       res.json({
         success: true,
         data: {
-          urls: dataResult.rows.map(row => ({
-            url: row.url,
-            clicks: parseInt(row.clicks),
-            impressions: parseInt(row.impressions),
-            ctr: parseFloat(row.ctr.toFixed(4)),
-            avg_position: parseFloat(row.avg_position.toFixed(2))
-          })),
+          urls: format === 'columns' ? toColumns(urls, URL_LIST_FIELDS) : urls,
           pagination: {
             limit,
             offset,
-            total: parseInt(countResult.rows[0].total),
-            has_more: offset + limit < parseInt(countResult.rows[0].total)
+            total,
+            has_more: offset + limit < total
           },
           meta: {
             site_url: siteUrl,
             period: { start, end },
-            source: "GSC"
+            source: "GSC",
+            layout: format
           }
         }
       });
@@ -202,6 +203,119 @@ class MetricsController {
     }
   }
 
+  async compareUrls(req, res) {
+    try {
+      const { error, value } = measureSync('validate', () => compareSchema.validate(req.query));
+
+      if (error) {
+        return res.status(400).json({
+          success: false,
+          error: 'validation_error',
+          message: error.details[0].message
+        });
+      }
+
+      const { siteUrl, start, end, compareStart, compareEnd, limit, orderBy, order } = value;
+
+      let cursor = null;
+      if (value.cursor) {
+        cursor = this.decodeCursor(value.cursor);
+        if (!cursor) {
+          return res.status(400).json({
+            success: false,
+            error: 'validation_error',
+            message: 'Invalid cursor'
+          });
+        }
+      }
+
+      const rows = await SearchAnalytics.comparePeriods(
+        siteUrl,
+        { start, end },
+        { start: compareStart, end: compareEnd },
+        { orderBy, order, limit: limit + 1, cursor }
+      );
+
+      const hasMore = rows.length > limit;
+      const pageRows = rows.slice(0, limit);
+      const lastRow = pageRows[pageRows.length - 1];
+
+      const round = (value, digits) => (value === null || value === undefined ? null : parseFloat(Number(value).toFixed(digits)));
+      const periodMetrics = (row, suffix) => ({
+        clicks: parseInt(row[`clicks_${suffix}`]),
+        impressions: parseInt(row[`impressions_${suffix}`]),
+        ctr: round(row[`ctr_${suffix}`], 4),
+        avg_position: round(row[`position_${suffix}`], 2)
+      });
+
+      res.json({
+        success: true,
+        data: {
+          urls: measureSync('map', () => pageRows.map(row => {
+            const current = periodMetrics(row, 'current');
+            const previous = periodMetrics(row, 'previous');
+
+            return {
+              url: row.url,
+              current,
+              previous,
+              delta: {
+                clicks: current.clicks - previous.clicks,
+                impressions: current.impressions - previous.impressions,
+                ctr: round(row.ctr_current - row.ctr_previous, 4),
+                avg_position: current.avg_position === null || previous.avg_position === null
+                  ? null
+                  : round(row.position_current - row.position_previous, 2)
+              }
+            };
+          })),
+          pagination: {
+            limit,
+            total: lastRow ? parseInt(lastRow.total) : null,
+            has_more: hasMore,
+            next_cursor: hasMore ? this.encodeCursor(lastRow) : null
+          },
+          meta: {
+            site_url: siteUrl,
+            period: { start, end },
+            compare_period: { start: compareStart, end: compareEnd },
+            order_by: orderBy,
+            order,
+            source: "GSC"
+          }
+        }
+      });
+    } catch (error) {
+      logger.error('Failed to compare URL periods', {
+        error: error.message,
+        query: req.query
+      });
+
+      res.status(500).json({
+        success: false,
+        error: 'url_compare_failed',
+        message: 'Failed to compare URL periods',
+        request_id: req.requestId || 'unknown'
+      });
+    }
+  }
+
+  encodeCursor(row) {
+    return Buffer.from(JSON.stringify({ v: row.sort_value, u: row.url })).toString('base64url');
+  }
+
+  decodeCursor(cursor) {
+    try {
+      const { v, u } = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+      if (typeof v !== 'number' || typeof u !== 'string') {
+        return null;
+      }
+      return { value: v, url: u };
+    } catch (error) {
+      return null;
+    }
+  }
+
   inferSiteUrl(url) {
     try {
       const urlObj = new URL(url);
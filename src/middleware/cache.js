@@ -1,5 +1,6 @@
 const redisClient = require('../config/redis');
 const { createLogger } = require('../utils/logger');
+const { measure } = require('../utils/timing');
 
 const logger = createLogger('Cache');
 
@@ -12,7 +13,7 @@ const cacheMiddleware = (ttl = null) => {
     const cacheKey = generateCacheKey(req);
     
     try {
-      const cachedData = await redisClient.get(cacheKey);
+      const cachedData = await measure('cache', () => redisClient.get(cacheKey));
       
       if (cachedData) {
         logger.info('Cache hit', { key: cacheKey });
@@ -76,6 +77,38 @@ const invalidateCache = async (pattern) => {
   }
 };
 
+// Version d'ingestion par site : change à chaque import terminé (ETag, clés de cache)
+const getIngestVersion = async (siteUrl) => {
+  if (!siteUrl || !redisClient.isConnected) {
+    return null;
+  }
+
+  const key = ingestVersionKey(siteUrl);
+  const version = await redisClient.get(key);
+  if (version) {
+    return version;
+  }
+
+  // Première lecture : on fixe une version pour les données déjà présentes
+  const initialVersion = Date.now().toString(36);
+  await redisClient.set(key, initialVersion);
+  return initialVersion;
+};
+
+const bumpIngestVersion = async (siteUrl) => {
+  if (!redisClient.isConnected) {
+    return null;
+  }
+
+  const version = Date.now().toString(36);
+  const stored = await redisClient.set(ingestVersionKey(siteUrl), version);
+
+  if (stored) {
+    logger.info('Ingest version bumped', { siteUrl, version });
+  }
+  return version;
+};
+
 const invalidateCacheForSite = async (siteUrl, startDate = null, endDate = null) => {
   const patterns = [
     `metrics:url:${siteUrl}:*`,
@@ -90,8 +123,16 @@ const invalidateCacheForSite = async (siteUrl, startDate = null, endDate = null)
   await Promise.all(patterns.map(pattern => invalidateCache(pattern)));
 };
 
+function ingestVersionKey(siteUrl) {
+  return `ingest_version:${siteUrl}`;
+}
+
 function generateCacheKey(req) {
   const parts = ['api', req.path.replace(/^\//, '').replace(/\//g, ':')];
+
+  if (req.ingestVersion) {
+    parts.push(`v:${req.ingestVersion}`);
+  }
   
   const queryKeys = Object.keys(req.query).sort();
   queryKeys.forEach(key => {
@@ -121,5 +162,7 @@ function getCacheTtl(path) {
 module.exports = {
   cacheMiddleware,
   invalidateCache,
-  invalidateCacheForSite
+  invalidateCacheForSite,
+  getIngestVersion,
+  bumpIngestVersion
 };
\ No newline at end of file
@@ -0,0 +1,83 @@
+const zlib = require('zlib');
+const { createLogger } = require('../utils/logger');
+const { currentTiming, now } = require('../utils/timing');
+
+const logger = createLogger('Compression');
+
+const BROTLI_OPTIONS = {
+  params: {
+    [zlib.constants.BROTLI_PARAM_MODE]: zlib.constants.BROTLI_MODE_TEXT,
+    // Qualité 4 : bon ratio sur du JSON sans le coût CPU des niveaux élevés
+    [zlib.constants.BROTLI_PARAM_QUALITY]: 4
+  }
+};
+
+const compressResponse = (options = {}) => {
+  const threshold = options.threshold || parseInt(process.env.COMPRESSION_THRESHOLD_BYTES) || 1024;
+
+  return (req, res, next) => {
+    res.vary('Accept-Encoding');
+
+    const encoding = req.acceptsEncodings('br', 'gzip');
+    if (encoding !== 'br' && encoding !== 'gzip') {
+      return next();
+    }
+
+    const originalSend = res.send;
+    res.send = function(body) {
+      const passThrough = body === undefined
+        || body === null
+        || (typeof body === 'object' && !Buffer.isBuffer(body))
+        || req.method === 'HEAD'
+        || res.statusCode === 204
+        || res.statusCode === 304
+        || res.get('Content-Encoding');
+
+      if (passThrough) {
+        return originalSend.call(this, body);
+      }
+
+      const buffer = Buffer.isBuffer(body) ? body : Buffer.from(String(body));
+      if (buffer.length < threshold) {
+        return originalSend.call(this, body);
+      }
+
+      if (!res.get('Content-Type')) {
+        res.type('html');
+      }
+
+      const timing = currentTiming();
+      const startedAt = now();
+
+      const done = (error, compressed) => {
+        if (timing) {
+          timing.add('compress', now() - startedAt);
+        }
+
+        if (error) {
+          logger.warn('Response compression failed', { error: error.message, requestId: req.requestId });
+          return originalSend.call(res, body);
+        }
+
+        res.set('Content-Encoding', encoding);
+        originalSend.call(res, compressed);
+      };
+
+      if (encoding === 'br') {
+        zlib.brotliCompress(buffer, {
+          params: { ...BROTLI_OPTIONS.params, [zlib.constants.BROTLI_PARAM_SIZE_HINT]: buffer.length }
+        }, done);
+      } else {
+        zlib.gzip(buffer, { level: 6 }, done);
+      }
+
+      return res;
+    };
+
+    next();
+  };
+};
+
+module.exports = {
+  compressResponse
+};
@@ -0,0 +1,84 @@
+const crypto = require('crypto');
+const { getIngestVersion } = require('./cache');
+const { createLogger } = require('../utils/logger');
+const { measure } = require('../utils/timing');
+
+const logger = createLogger('Conditional');
+
+// ETag dérivé de la version d'ingestion du site (Redis) : un 304 part sans requête SQL
+const conditionalGet = () => {
+  return async (req, res, next) => {
+    if (req.method !== 'GET') {
+      return next();
+    }
+
+    const siteUrl = resolveSiteUrl(req.query);
+    if (!siteUrl) {
+      return next();
+    }
+
+    try {
+      const version = await measure('etag', () => getIngestVersion(siteUrl));
+      if (!version) {
+        return next();
+      }
+
+      req.ingestVersion = version;
+      const etag = generateEtag(version, req);
+
+      res.set('ETag', etag);
+      res.set('Cache-Control', 'private, no-cache');
+
+      if (matchesEtag(req.get('If-None-Match'), etag)) {
+        logger.debug('Not modified', { etag, requestId: req.requestId });
+        return res.status(304).send();
+      }
+    } catch (error) {
+      logger.warn('Conditional request check failed', { error: error.message, siteUrl });
+    }
+
+    next();
+  };
+};
+
+function resolveSiteUrl(query) {
+  if (query.siteUrl) {
+    return query.siteUrl;
+  }
+
+  // Même déduction que MetricsController.inferSiteUrl
+  try {
+    const urlObj = new URL(query.url);
+    return `${urlObj.protocol}//${urlObj.host}/`;
+  } catch (error) {
+    return null;
+  }
+}
+
+function generateEtag(version, req) {
+  const params = Object.keys(req.query)
+    .filter(key => key !== 'api_key')
+    .sort()
+    .map(key => `${key}=${req.query[key]}`)
+    .join('&');
+
+  const hash = crypto.createHash('sha1')
+    .update(`${version}|${req.baseUrl}${req.path}|${params}`)
+    .digest('base64url')
+    .slice(0, 27);
+
+  return `W/"${version}-${hash}"`;
+}
+
+function matchesEtag(header, etag) {
+  if (!header) {
+    return false;
+  }
+
+  const weak = (tag) => tag.trim().replace(/^W\//, '');
+  return header.split(',').some(tag => tag.trim() === '*' || weak(tag) === weak(etag));
+}
+
+module.exports = {
+  conditionalGet
+};
@@ -1,11 +1,19 @@
 const { v4: uuidv4 } = require('uuid');
 const { createLogger } = require('../utils/logger');
+const { RequestTiming, runWithTiming, measureSync } = require('../utils/timing');
 
 const logger = createLogger('Request');
+const slowLogger = createLogger('SlowLog');
+
+const slowRequestMs = parseInt(process.env.SLOW_REQUEST_MS) || 1000;
+const slowLogSampleRate = process.env.SLOW_LOG_SAMPLE_RATE !== undefined
+  ? parseFloat(process.env.SLOW_LOG_SAMPLE_RATE)
+  : 1;
 
 const requestLogger = (req, res, next) => {
   req.requestId = uuidv4();
   req.startTime = Date.now();
+  req.timing = new RequestTiming();
 
   logger.info('Request started', {
     requestId: req.requestId,
@@ -15,22 +23,49 @@ const requestLogger = (req, res, next) => {
     ip: req.ip
   });
 
+  // Sérialisation mesurée à part : res.json d'Express enchaîne directement sur res.send
+  res.json = function(obj) {
+    const body = measureSync('serialize', () => JSON.stringify(obj));
+    if (!this.get('Content-Type')) {
+      this.set('Content-Type', 'application/json');
+    }
+    return this.send(body);
+  };
+
   const originalSend = res.send;
   res.send = function(body) {
     const duration = Date.now() - req.startTime;
-    
+    const timings = req.timing.toJSON();
+
+    if (!res.headersSent) {
+      res.set('Server-Timing', req.timing.toServerTiming());
+    }
+
     logger.info('Request completed', {
       requestId: req.requestId,
       method: req.method,
       url: req.url,
       statusCode: res.statusCode,
-      duration: `${duration}ms`
+      duration: `${duration}ms`,
+      timings
     });
 
+    if (duration >= slowRequestMs && Math.random() < slowLogSampleRate) {
+      slowLogger.warn('Slow request', {
+        requestId: req.requestId,
+        method: req.method,
+        url: req.url,
+        statusCode: res.statusCode,
+        durationMs: duration,
+        thresholdMs: slowRequestMs,
+        timings
+      });
+    }
+
     originalSend.call(this, body);
   };
 
-  next();
+  runWithTiming(req.timing, next);
 };
 
-module.exports = requestLogger;
\ No newline at end of file
+module.exports = requestLogger;
@@ -0,0 +1,305 @@
+const crypto = require('crypto');
+const db = require('../config/database');
+
+const isPostgres = (process.env.DB_TYPE || 'sqlite') !== 'sqlite';
+const ENQUEUE_CHUNK_SIZE = 50;
+const CLAIM_CANDIDATES = 10;
+const CLAIM_MAX_ROUNDS = 5;
+
+class ImportWorkUnit {
+  static async enqueue(jobId, units) {
+    if (units.length === 0) return 0;
+
+    const columns = [
+      'job_id', 'site_url', 'date', 'dimensions', 'search_type', 'data_state', 'filters', 'scope_key', 'available_at'
+    ];
+    const availableAt = new Date().toISOString();
+    let inserted = 0;
+
+    for (let i = 0; i < units.length; i += ENQUEUE_CHUNK_SIZE) {
+      const chunk = units.slice(i, i + ENQUEUE_CHUNK_SIZE);
+
+      const values = chunk.map((_, index) => {
+        const offset = index * columns.length;
+        return `(${columns.map((_, c) => `$${offset + c + 1}`).join(', ')})`;
+      }).join(', ');
+
+      const params = chunk.flatMap(unit => [
+        jobId,
+        unit.siteUrl,
+        unit.date,
+        JSON.stringify(unit.dimensions),
+        unit.searchType,
+        unit.dataState,
+        JSON.stringify(unit.filters || {}),
+        this.scopeKey(unit.dimensions, unit.filters),
+        availableAt
+      ]);
+
+      // Les unités déjà en attente/en cours pour la même propriété, le même jour et le même périmètre sont ignorées
+      const query = `
+        INSERT INTO import_work_units (${columns.join(', ')})
+        VALUES ${values}
+        ON CONFLICT DO NOTHING
+      `;
+
+      const result = await db.query(query, params);
+      inserted += affectedRows(result);
+    }
+
+    return inserted;
+  }
+
+  // Jobs actifs qui détiennent déjà des jours de cette plage avec le même périmètre
+  static async findActiveJobIds({ siteUrl, searchType, dataState, scopeKey, start, end, excludeJobId }) {
+    const query = `
+      SELECT DISTINCT job_id FROM import_work_units
+      WHERE site_url = $1 AND search_type = $2 AND data_state = $3 AND scope_key = $4
+        AND date >= $5 AND date <= $6 AND job_id <> $7
+        AND status IN ('pending', 'running')
+      ORDER BY job_id
+    `;
+
+    const result = await db.query(query, [siteUrl, searchType, dataState, scopeKey, start, end, excludeJobId]);
+    return result.rows.map(row => row.job_id);
+  }
+
+  // Périmètre d'un import (dimensions + filtres) : deux imports différents du même jour ne se dédoublonnent pas
+  static scopeKey(dimensions, filters = {}) {
+    const canonicalFilters = Object.keys(filters || {})
+      .filter(key => filters[key] !== undefined && filters[key] !== null && filters[key] !== '')
+      .sort()
+      .map(key => [key, filters[key]]);
+
+    return crypto
+      .createHash('sha1')
+      .update(JSON.stringify({ dimensions: [...dimensions].sort(), filters: canonicalFilters }))
+      .digest('hex');
+  }
+
+  static async claim(workerId, { leaseMs, maxPerProperty }) {
+    const now = new Date();
+    const nowIso = now.toISOString();
+    const leaseExpiresAt = new Date(now.getTime() + leaseMs).toISOString();
+
+    if (isPostgres) {
+      // Le COUNT(*) d'un claimer ne voit pas les leases non commités des autres : le verrou
+      // consultatif par propriété sérialise le contrôle du quota jusqu'au COMMIT
+      return db.transaction(async (client) => {
+        const skippedProperties = new Set();
+        const skippedJobs = new Set();
+
+        for (let round = 0; round < CLAIM_MAX_ROUNDS; round++) {
+          // Pré-filtre sur les quotas : une propriété ou un job saturé ne masque pas les unités des autres
+          const candidates = await client.query(`
+            SELECT c.id, c.site_url, c.job_id FROM import_work_units c
+            WHERE ((c.status = 'pending' AND c.available_at <= $1)
+               OR (c.status = 'running' AND c.lease_expires_at < $1))
+              AND (
+                SELECT COUNT(*) FROM import_work_units r
+                WHERE r.site_url = c.site_url AND r.status = 'running' AND r.lease_expires_at >= $1
+              ) < $2
+              AND (
+                SELECT COUNT(*) FROM import_work_units r
+                WHERE r.job_id = c.job_id AND r.status = 'running' AND r.lease_expires_at >= $1
+              ) < COALESCE((SELECT j.max_leases FROM import_jobs j WHERE j.id = c.job_id), $2)
+              AND c.site_url <> ALL($3::text[])
+              AND c.job_id <> ALL($4::int[])
+            ORDER BY c.available_at, c.id
+            LIMIT $5
+            FOR UPDATE SKIP LOCKED
+          `, [nowIso, maxPerProperty, [...skippedProperties], [...skippedJobs], CLAIM_CANDIDATES]);
+
+          if (candidates.rows.length === 0) return null;
+
+          for (const candidate of candidates.rows) {
+            if (skippedProperties.has(candidate.site_url) || skippedJobs.has(candidate.job_id)) continue;
+
+            // Variante non bloquante : un autre claimer tient déjà cette propriété, on passe à la suivante
+            const lock = await client.query(
+              'SELECT pg_try_advisory_xact_lock(hashtext($1)) as locked',
+              [candidate.site_url]
+            );
+            if (!lock.rows[0].locked) {
+              skippedProperties.add(candidate.site_url);
+              continue;
+            }
+
+            // Revérification sous verrou : le pré-filtre a pu lire un état antérieur au COMMIT d'un autre claimer.
+            // Un job n'a qu'une propriété, le même verrou couvre donc sa limite de leases
+            const active = await client.query(`
+              SELECT
+                COUNT(*) as running,
+                SUM(CASE WHEN job_id = $3 THEN 1 ELSE 0 END) as job_running,
+                (SELECT j.max_leases FROM import_jobs j WHERE j.id = $3) as job_max_leases
+              FROM import_work_units
+              WHERE site_url = $1 AND status = 'running' AND lease_expires_at >= $2
+            `, [candidate.site_url, nowIso, candidate.job_id]);
+
+            const { running, job_running: jobRunning, job_max_leases: jobMaxLeases } = active.rows[0];
+
+            if (parseInt(running) >= maxPerProperty) {
+              skippedProperties.add(candidate.site_url);
+              continue;
+            }
+
+            if (jobMaxLeases !== null && (parseInt(jobRunning) || 0) >= parseInt(jobMaxLeases)) {
+              skippedJobs.add(candidate.job_id);
+              continue;
+            }
+
+            const claimed = await client.query(`
+              UPDATE import_work_units
+              SET status = 'running', worker_id = $1, lease_expires_at = $2, attempts = attempts + 1
+              WHERE id = $3
+              RETURNING *
+            `, [workerId, leaseExpiresAt, candidate.id]);
+
+            return this.parse(claimed.rows[0]);
+          }
+        }
+
+        return null;
+      });
+    }
+
+    // SQLite n'a pas de SKIP LOCKED : sélection puis compare-and-swap sur le statut
+    const candidates = await db.query(`
+      SELECT c.id FROM import_work_units c
+      WHERE ((c.status = 'pending' AND c.available_at <= $1)
+         OR (c.status = 'running' AND c.lease_expires_at < $2))
+        AND (
+          SELECT COUNT(*) FROM import_work_units r
+          WHERE r.site_url = c.site_url AND r.status = 'running' AND r.lease_expires_at >= $3
+        ) < $4
+        AND (
+          SELECT COUNT(*) FROM import_work_units r
+          WHERE r.job_id = c.job_id AND r.status = 'running' AND r.lease_expires_at >= $5
+        ) < COALESCE((SELECT j.max_leases FROM import_jobs j WHERE j.id = c.job_id), $6)
+      ORDER BY c.available_at, c.id
+      LIMIT 5
+    `, [nowIso, nowIso, nowIso, maxPerProperty, nowIso, maxPerProperty]);
+
+    for (const candidate of candidates.rows) {
+      // Les quotas sont revérifiés dans l'UPDATE : SQLite sérialise les écritures, le contrôle est atomique
+      const result = await db.query(`
+        UPDATE import_work_units
+        SET status = 'running', worker_id = $1, lease_expires_at = $2, attempts = attempts + 1
+        WHERE id = $3
+          AND ((status = 'pending' AND available_at <= $4) OR (status = 'running' AND lease_expires_at < $5))
+          AND (
+            SELECT COUNT(*) FROM import_work_units r
+            WHERE r.site_url = import_work_units.site_url AND r.status = 'running' AND r.lease_expires_at >= $6
+          ) < $7
+          AND (
+            SELECT COUNT(*) FROM import_work_units r
+            WHERE r.job_id = import_work_units.job_id AND r.status = 'running' AND r.lease_expires_at >= $8
+          ) < COALESCE((SELECT j.max_leases FROM import_jobs j WHERE j.id = import_work_units.job_id), $9)
+      `, [workerId, leaseExpiresAt, candidate.id, nowIso, nowIso, nowIso, maxPerProperty, nowIso, maxPerProperty]);
+
+      if (affectedRows(result) === 1) {
+        const claimed = await db.query('SELECT * FROM import_work_units WHERE id = $1', [candidate.id]);
+        return this.parse(claimed.rows[0]);
+      }
+    }
+
+    return null;
+  }
+
+  static async heartbeat(id, workerId, leaseMs) {
+    const leaseExpiresAt = new Date(Date.now() + leaseMs).toISOString();
+    const query = `
+      UPDATE import_work_units
+      SET lease_expires_at = $1
+      WHERE id = $2 AND worker_id = $3 AND status = 'running'
+    `;
+
+    const result = await db.query(query, [leaseExpiresAt, id, workerId]);
+    return affectedRows(result) === 1;
+  }
+
+  static async complete(id, workerId, rowsImported) {
+    const query = `
+      UPDATE import_work_units
+      SET status = 'completed', rows_imported = $1, error_message = NULL, lease_expires_at = NULL, completed_at = NOW()
+      WHERE id = $2 AND worker_id = $3 AND status = 'running'
+    `;
+
+    const result = await db.query(query, [rowsImported, id, workerId]);
+    return affectedRows(result) === 1;
+  }
+
+  static async release(id, workerId, errorMessage, retryDelayMs) {
+    const availableAt = new Date(Date.now() + retryDelayMs).toISOString();
+    const query = `
+      UPDATE import_work_units
+      SET status = 'pending', error_message = $1, lease_expires_at = NULL, available_at = $2
+      WHERE id = $3 AND worker_id = $4 AND status = 'running'
+    `;
+
+    const result = await db.query(query, [errorMessage, availableAt, id, workerId]);
+    return affectedRows(result) === 1;
+  }
+
+  static async fail(id, workerId, errorMessage) {
+    const query = `
+      UPDATE import_work_units
+      SET status = 'failed', error_message = $1, lease_expires_at = NULL, completed_at = NOW()
+      WHERE id = $2 AND worker_id = $3 AND status = 'running'
+    `;
+
+    const result = await db.query(query, [errorMessage, id, workerId]);
+    return affectedRows(result) === 1;
+  }
+
+  static async getJobProgress(jobId) {
+    const query = `
+      SELECT
+        COUNT(*) as total_units,
+        SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending_units,
+        SUM(CASE WHEN status = 'running' THEN 1 ELSE 0 END) as running_units,
+        SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_units,
+        SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_units,
+        COALESCE(SUM(rows_imported), 0) as rows_imported
+      FROM import_work_units
+      WHERE job_id = $1
+    `;
+
+    const result = await db.query(query, [jobId]);
+    const row = result.rows[0] || {};
+
+    return {
+      totalUnits: parseInt(row.total_units) || 0,
+      pendingUnits: parseInt(row.pending_units) || 0,
+      runningUnits: parseInt(row.running_units) || 0,
+      completedUnits: parseInt(row.completed_units) || 0,
+      failedUnits: parseInt(row.failed_units) || 0,
+      rowsImported: parseInt(row.rows_imported) || 0
+    };
+  }
+
+  static parse(row) {
+    return {
+      ...row,
+      date: toDateString(row.date),
+      dimensions: typeof row.dimensions === 'string' ? JSON.parse(row.dimensions) : row.dimensions,
+      filters: typeof row.filters === 'string' ? JSON.parse(row.filters) : (row.filters || {})
+    };
+  }
+}
+
+function affectedRows(result) {
+  return result.rowCount ?? result.rowsAffected ?? 0;
+}
+
+function toDateString(value) {
+  if (value instanceof Date) {
+    // pg renvoie les colonnes DATE à minuit heure locale
+    const month = String(value.getMonth() + 1).padStart(2, '0');
+    const day = String(value.getDate()).padStart(2, '0');
+    return `${value.getFullYear()}-${month}-${day}`;
+  }
+  return String(value).slice(0, 10);
+}
+
+module.exports = ImportWorkUnit;
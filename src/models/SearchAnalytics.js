@@ -1,4 +1,34 @@
 const db = require('../config/database');
+const { planBuckets } = require('../utils/dateBuckets');
+const { measure } = require('../utils/timing');
+
+const ROLLUPS = {
+  month: { table: 'gsc_url_monthly', column: 'month_start' },
+  week: { table: 'gsc_url_weekly', column: 'week_start' }
+};
+
+// Mêmes bornes que les rollups (date_trunc : semaine ISO commençant le lundi)
+const FILTERED_BUCKET_EXPRESSIONS = {
+  day: 'date',
+  week: "date_trunc('week', date)::date",
+  month: "date_trunc('month', date)::date"
+};
+
+const COMPARE_SORT_EXPRESSIONS = {
+  clicks_delta: 'clicks_current - clicks_previous',
+  impressions_delta: 'impressions_current - impressions_previous',
+  ctr_delta: 'ctr_current - ctr_previous',
+  position_delta: 'position_current - position_previous',
+  clicks: 'clicks_current',
+  impressions: 'impressions_current'
+};
+
+const URL_LIST_ORDER_COLUMNS = {
+  clicks: 'clicks',
+  impressions: 'impressions',
+  ctr: 'ctr',
+  position: 'avg_position'
+};
 
 class SearchAnalytics {
   static async bulkInsert(records) {
@@ -44,11 +74,99 @@ class SearchAnalytics {
         ingested_at = NOW()
     `;
 
-    const result = await db.query(query, params);
+    const result = await measure('sql_insert', () => db.query(query, params));
     return result.rowCount;
   }
 
-  static async getMetricsForUrl(siteUrl, pageNormalized, startDate, endDate, filters = {}) {
+  static async getMetricsForUrl(siteUrl, pageNormalized, startDate, endDate, filters = {}, granularity = 'day') {
+    // Ni la vue quotidienne ni les rollups n'ont pays/appareil : les requêtes filtrées lisent la table brute
+    if (filters.country || filters.device) {
+      return this.getFilteredMetricsForUrl(siteUrl, pageNormalized, startDate, endDate, filters, granularity);
+    }
+
+    const totalsParams = [siteUrl, pageNormalized];
+    const totalsSource = this.rollupSource(
+      planBuckets(startDate, endDate), 'total', 'site_url = $1 AND page_normalized = $2', totalsParams
+    );
+
+    const totalsQuery = `
+      SELECT 
+        SUM(total_clicks) as total_clicks,
+        SUM(total_impressions) as total_impressions,
+        CASE 
+          WHEN SUM(total_impressions) > 0 THEN SUM(total_clicks)::DOUBLE PRECISION / SUM(total_impressions)::DOUBLE PRECISION
+          ELSE 0
+        END as avg_ctr,
+        CASE 
+          WHEN SUM(total_impressions) > 0 THEN SUM(position_weighted) / SUM(total_impressions)
+          ELSE 0
+        END as avg_position,
+        MAX(last_date) as last_data_date,
+        SUM(days_with_data) as days_with_data
+      FROM (${totalsSource}) s
+    `;
+
+    let timeseriesQuery;
+    let timeseriesParams;
+
+    if (granularity === 'day') {
+      timeseriesParams = [siteUrl, pageNormalized, startDate, endDate];
+      timeseriesQuery = `
+        SELECT 
+          date,
+          total_clicks as clicks,
+          total_impressions as impressions,
+          calculated_ctr as ctr,
+          avg_position
+        FROM gsc_url_daily
+        WHERE site_url = $1 AND page_normalized = $2 AND date >= $3 AND date <= $4
+        ORDER BY date
+      `;
+    } else {
+      timeseriesParams = [siteUrl, pageNormalized];
+      const timeseriesSource = this.rollupSource(
+        planBuckets(startDate, endDate, [granularity]), granularity, 'site_url = $1 AND page_normalized = $2', timeseriesParams
+      );
+
+      timeseriesQuery = `
+        SELECT 
+          bucket as date,
+          SUM(total_clicks) as clicks,
+          SUM(total_impressions) as impressions,
+          CASE 
+            WHEN SUM(total_impressions) > 0 THEN SUM(total_clicks)::DOUBLE PRECISION / SUM(total_impressions)::DOUBLE PRECISION
+            ELSE 0
+          END as ctr,
+          CASE 
+            WHEN SUM(total_impressions) > 0 THEN SUM(position_weighted) / SUM(total_impressions)
+            ELSE 0
+          END as avg_position
+        FROM (${timeseriesSource}) s
+        GROUP BY bucket
+        ORDER BY bucket
+      `;
+    }
+
+    const [timeseriesResult, totalsResult] = await Promise.all([
+      measure('sql_timeseries', () => db.query(timeseriesQuery, timeseriesParams)),
+      measure('sql_totals', () => db.query(totalsQuery, totalsParams))
+    ]);
+
+    return {
+      timeseries: timeseriesResult.rows,
+      totals: totalsResult.rows[0] || {
+        total_clicks: 0,
+        total_impressions: 0,
+        avg_ctr: 0,
+        avg_position: 0,
+        last_data_date: null,
+        days_with_data: 0
+      }
+    };
+  }
+
+  // Pays/appareil n'existent que dans la table brute : agrégation à la volée, bucketée par granularité
+  static async getFilteredMetricsForUrl(siteUrl, pageNormalized, startDate, endDate, filters = {}, granularity = 'day') {
     let whereClause = `
       WHERE site_url = $1 
       AND page_normalized = $2 
@@ -69,38 +187,48 @@ class SearchAnalytics {
       params.push(filters.device);
     }
 
+    const bucket = FILTERED_BUCKET_EXPRESSIONS[granularity] || FILTERED_BUCKET_EXPRESSIONS.day;
+
     const timeseriesQuery = `
       SELECT 
-        date,
-        total_clicks as clicks,
-        total_impressions as impressions,
-        calculated_ctr as ctr,
-        avg_position
-      FROM gsc_url_daily
+        ${bucket} as date,
+        SUM(clicks) as clicks,
+        SUM(impressions) as impressions,
+        CASE 
+          WHEN SUM(impressions) > 0 THEN SUM(clicks)::DOUBLE PRECISION / SUM(impressions)::DOUBLE PRECISION
+          ELSE 0
+        END as ctr,
+        CASE 
+          WHEN SUM(impressions) > 0 THEN SUM(position * impressions) / SUM(impressions)
+          ELSE 0
+        END as avg_position
+      FROM gsc_search_analytics
       ${whereClause}
-      ORDER BY date
+      GROUP BY ${bucket}
+      ORDER BY ${bucket}
     `;
 
     const totalsQuery = `
       SELECT 
-        SUM(total_clicks) as total_clicks,
-        SUM(total_impressions) as total_impressions,
+        SUM(clicks) as total_clicks,
+        SUM(impressions) as total_impressions,
         CASE 
-          WHEN SUM(total_impressions) > 0 THEN SUM(total_clicks)::DOUBLE PRECISION / SUM(total_impressions)::DOUBLE PRECISION
+          WHEN SUM(impressions) > 0 THEN SUM(clicks)::DOUBLE PRECISION / SUM(impressions)::DOUBLE PRECISION
           ELSE 0
         END as avg_ctr,
         CASE 
-          WHEN SUM(total_impressions) > 0 THEN SUM(avg_position * total_impressions) / SUM(total_impressions)
+          WHEN SUM(impressions) > 0 THEN SUM(position * impressions) / SUM(impressions)
           ELSE 0
         END as avg_position,
-        MAX(date) as last_data_date
-      FROM gsc_url_daily
+        MAX(date) as last_data_date,
+        COUNT(DISTINCT date) as days_with_data
+      FROM gsc_search_analytics
       ${whereClause}
     `;
 
     const [timeseriesResult, totalsResult] = await Promise.all([
-      db.query(timeseriesQuery, params),
-      db.query(totalsQuery, params)
+      measure('sql_timeseries', () => db.query(timeseriesQuery, params)),
+      measure('sql_totals', () => db.query(totalsQuery, params))
     ]);
 
     return {
@@ -110,11 +238,150 @@ class SearchAnalytics {
         total_impressions: 0,
         avg_ctr: 0,
         avg_position: 0,
-        last_data_date: null
+        last_data_date: null,
+        days_with_data: 0
       }
     };
   }
 
+
+  static async listUrls(siteUrl, startDate, endDate, { limit, offset, orderBy, order }) {
+    const params = [siteUrl];
+    const source = this.rollupSource(planBuckets(startDate, endDate), 'total', 'site_url = $1', params);
+    const countParams = [...params];
+
+    params.push(limit, offset);
+
+    const query = `
+      SELECT 
+        page_normalized as url,
+        SUM(total_clicks) as clicks,
+        SUM(total_impressions) as impressions,
+        CASE 
+          WHEN SUM(total_impressions) > 0 THEN SUM(total_clicks)::DOUBLE PRECISION / SUM(total_impressions)::DOUBLE PRECISION
+          ELSE 0
+        END as ctr,
+        CASE 
+          WHEN SUM(total_impressions) > 0 THEN SUM(position_weighted) / SUM(total_impressions)
+          ELSE 0
+        END as avg_position
+      FROM (${source}) s
+      GROUP BY page_normalized
+      ORDER BY ${URL_LIST_ORDER_COLUMNS[orderBy]} ${order.toUpperCase()}, page_normalized
+      LIMIT $${params.length - 1} OFFSET $${params.length}
+    `;
+
+    const countQuery = `
+      SELECT COUNT(DISTINCT page_normalized) as total
+      FROM (${source}) s
+    `;
+
+    const [dataResult, countResult] = await Promise.all([
+      measure('sql_url_list', () => db.query(query, params)),
+      measure('sql_url_count', () => db.query(countQuery, countParams))
+    ]);
+
+    return {
+      rows: dataResult.rows,
+      total: parseInt(countResult.rows[0].total) || 0
+    };
+  }
+
+  /**
+   * Compare deux périodes par URL en un seul parcours de gsc_url_daily (agrégation conditionnelle).
+   * Les pages présentes dans une seule période sont conservées. Pagination par keyset sur
+   * (sort_value, url) : `cursor` est la dernière ligne de la page précédente.
+   */
+  static async comparePeriods(siteUrl, current, previous, { orderBy, order, limit, cursor = null }) {
+    const params = [siteUrl, current.start, current.end, previous.start, previous.end];
+    const direction = order === 'asc' ? 'ASC' : 'DESC';
+
+    let keysetClause = '';
+    if (cursor) {
+      params.push(cursor.value, cursor.url);
+      const comparator = direction === 'ASC' ? '>' : '<';
+      keysetClause = `WHERE (sort_value, url) ${comparator} ($${params.length - 1}::DOUBLE PRECISION, $${params.length}::TEXT)`;
+    }
+
+    params.push(limit);
+
+    const query = `
+      WITH periods AS (
+        SELECT 
+          page_normalized as url,
+          SUM(CASE WHEN date >= $2 AND date <= $3 THEN total_clicks ELSE 0 END) as clicks_current,
+          SUM(CASE WHEN date >= $2 AND date <= $3 THEN total_impressions ELSE 0 END) as impressions_current,
+          SUM(CASE WHEN date >= $2 AND date <= $3 THEN avg_position * total_impressions ELSE 0 END) as position_weighted_current,
+          SUM(CASE WHEN date >= $4 AND date <= $5 THEN total_clicks ELSE 0 END) as clicks_previous,
+          SUM(CASE WHEN date >= $4 AND date <= $5 THEN total_impressions ELSE 0 END) as impressions_previous,
+          SUM(CASE WHEN date >= $4 AND date <= $5 THEN avg_position * total_impressions ELSE 0 END) as position_weighted_previous
+        FROM gsc_url_daily
+        WHERE site_url = $1
+          AND ((date >= $2 AND date <= $3) OR (date >= $4 AND date <= $5))
+        GROUP BY page_normalized
+      ),
+      metrics AS (
+        SELECT 
+          *,
+          CASE WHEN impressions_current > 0 THEN clicks_current::DOUBLE PRECISION / impressions_current::DOUBLE PRECISION ELSE 0 END as ctr_current,
+          CASE WHEN impressions_previous > 0 THEN clicks_previous::DOUBLE PRECISION / impressions_previous::DOUBLE PRECISION ELSE 0 END as ctr_previous,
+          CASE WHEN impressions_current > 0 THEN position_weighted_current / impressions_current END as position_current,
+          CASE WHEN impressions_previous > 0 THEN position_weighted_previous / impressions_previous END as position_previous,
+          COUNT(*) OVER () as total
+        FROM periods
+      ),
+      ranked AS (
+        SELECT 
+          *,
+          COALESCE((${COMPARE_SORT_EXPRESSIONS[orderBy]})::DOUBLE PRECISION, 0) as sort_value
+        FROM metrics
+      )
+      SELECT * FROM ranked
+      ${keysetClause}
+      ORDER BY sort_value ${direction}, url ${direction}
+      LIMIT $${params.length}
+    `;
+
+    const result = await measure('sql_compare', () => db.query(query, params));
+    return result.rows;
+  }
+
+  /**
+   * UNION ALL des mois entiers, semaines entières et jours restants d'un plan de buckets.
+   * Chaque ligne expose total_clicks, total_impressions et position_weighted
+   * (SUM(position * impressions)), ce qui garde la position moyenne pondérée exacte.
+   * `granularity` fixe la colonne bucket ('total', 'week' ou 'month'); `params` est complété.
+   */
+  static rollupSource(plan, granularity, whereSql, params) {
+    const selects = [];
+
+    for (const unit of ['month', 'week']) {
+      if (plan[unit].length === 0) continue;
+
+      const { table, column } = ROLLUPS[unit];
+      params.push(plan[unit]);
+      selects.push(`
+        SELECT ${column} as bucket, page_normalized, total_clicks, total_impressions,
+          position_weighted, days_with_data, last_date
+        FROM ${table}
+        WHERE ${whereSql} AND ${column} = ANY($${params.length}::date[])
+      `);
+    }
+
+    if (plan.day.length > 0) {
+      const bucket = granularity === 'total' ? 'date' : `date_trunc('${granularity}', date)::date`;
+      params.push(plan.day);
+      selects.push(`
+        SELECT ${bucket} as bucket, page_normalized, total_clicks, total_impressions,
+          avg_position * total_impressions as position_weighted, 1 as days_with_data, date as last_date
+        FROM gsc_url_daily
+        WHERE ${whereSql} AND date = ANY($${params.length}::date[])
+      `);
+    }
+
+    return selects.join(' UNION ALL ');
+  }
+
   static async getDateRange(siteUrl) {
     const query = `
       SELECT 
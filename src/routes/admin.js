@@ -0,0 +1,12 @@
+const express = require('express');
+const adminController = require('../controllers/adminController');
+const { requireApiKey } = require('../middleware/auth');
+
+const router = express.Router();
+
+router.use(requireApiKey);
+
+router.post('/profile/cpu', adminController.captureCpuProfile.bind(adminController));
+router.post('/profile/heap', adminController.captureHeapSnapshot.bind(adminController));
+
+module.exports = router;
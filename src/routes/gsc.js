@@ -3,8 +3,9 @@ const gscController = require('../controllers/gscController');
 
 const router = express.Router();
 
-router.get('/properties', gscController.getProperties);
-router.get('/check-access', gscController.checkAccess);
-router.post('/import', gscController.importData);
+router.get('/properties', gscController.getProperties.bind(gscController));
+router.get('/check-access', gscController.checkAccess.bind(gscController));
+router.post('/import', gscController.importData.bind(gscController));
+router.get('/import/:jobId', gscController.getImportJob.bind(gscController));
 
 module.exports = router;
\ No newline at end of file
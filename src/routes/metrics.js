@@ -3,7 +3,8 @@ const metricsController = require('../controllers/metricsController');
 
 const router = express.Router();
 
-router.get('/url', metricsController.getUrlMetrics);
-router.get('/urls', metricsController.getUrlList);
+router.get('/url', metricsController.getUrlMetrics.bind(metricsController));
+router.get('/urls', metricsController.getUrlList.bind(metricsController));
+router.get('/urls/compare', metricsController.compareUrls.bind(metricsController));
 
 module.exports = router;
\ No newline at end of file
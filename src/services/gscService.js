@@ -1,13 +1,17 @@
 const { google } = require('googleapis');
 const googleAuth = require('./googleAuth');
+const importEstimator = require('./importEstimator');
+const { bumpIngestVersion } = require('../middleware/cache');
+const { measure } = require('../utils/timing');
 const { normalizeUrl } = require('../utils/urlNormalizer');
 const { createLogger } = require('../utils/logger');
 
 // Only import database-related modules if not in skip mode
-let GSCProperty, SearchAnalytics, db;
+let GSCProperty, SearchAnalytics, ImportWorkUnit, db;
 if (!process.env.SKIP_DB_SAVE) {
   GSCProperty = require('../models/GSCProperty');
   SearchAnalytics = require('../models/SearchAnalytics');
+  ImportWorkUnit = require('../models/ImportWorkUnit');
   db = require('../config/database');
 }
 
@@ -17,6 +21,8 @@ class GSCService {
   constructor() {
     this.defaultDimensions = ['page', 'query', 'country', 'device'];
     this.maxRowLimit = 25000;
+    this.dayConcurrency = 3;
+    this.maxLeasesPerProperty = parseInt(process.env.IMPORT_MAX_LEASES_PER_PROPERTY) || 3;
     this.maxRetries = parseInt(process.env.MAX_RETRY_ATTEMPTS) || 3;
     this.retryDelay = parseInt(process.env.RETRY_DELAY_MS) || 1000;
   }
@@ -75,13 +81,14 @@ class GSCService {
       searchType = 'web',
       dataState = 'all',
       filters = {},
-      dryRun = false
+      dryRun = false,
+      queue = false
     } = params;
 
-    logger.info('Starting GSC import', { property, start, end, dimensions, searchType, dataState, dryRun });
+    logger.info('Starting GSC import', { property, start, end, dimensions, searchType, dataState, dryRun, queue });
 
     if (dryRun) {
-      const estimation = await this.estimateRows(property, start, end, dimensions, searchType);
+      const estimation = await this.estimateRows(property, start, end, dimensions, searchType, filters, dataState);
       return {
         status: 'dry_run_complete',
         estimation,
@@ -89,6 +96,10 @@ class GSCService {
       };
     }
 
+    if (queue) {
+      return this.enqueueImport(property, start, end, dimensions, searchType, dataState, filters);
+    }
+
     let jobId;
     try {
       // Create import job only if database is enabled
@@ -100,21 +111,25 @@ class GSCService {
         jobId = 'memory_' + Date.now(); // Generate a temporary ID for logging
       }
       
-      const startDate = new Date(start);
-      const endDate = new Date(end);
       let totalRowsImported = 0;
       let allData = []; // Collect all data for stateless mode
 
-      // Generate array of dates to process
-      const dates = [];
-      for (let date = new Date(startDate); date <= endDate; date.setDate(date.getDate() + 1)) {
-        dates.push(date.toISOString().split('T')[0]);
-      }
+      const dates = this.listDates(start, end);
 
-      logger.info(`Processing ${dates.length} days in parallel batches`, { property, dates: dates.length });
+      // Size parallelism from history only (no extra Google calls) so large days fit the memory budget
+      const plan = await importEstimator.estimate(
+        { property, start, end, dimensions, searchType, dataState, filters },
+        { probe: false, dayConcurrency: this.dayConcurrency }
+      );
+      const BATCH_SIZE = plan.recommendedConcurrency;
+
+      logger.info(`Processing ${dates.length} days in parallel batches of ${BATCH_SIZE}`, {
+        property,
+        dates: dates.length,
+        estimatedRows: plan.estimatedRows,
+        estimationSource: plan.source
+      });
 
-      // Process dates in parallel batches of 3
-      const BATCH_SIZE = 3;
       for (let i = 0; i < dates.length; i += BATCH_SIZE) {
         const batch = dates.slice(i, i + BATCH_SIZE);
         
@@ -178,7 +193,8 @@ class GSCService {
       }
 
       if (!process.env.SKIP_DB_SAVE) {
-        await db.refreshMaterializedView();
+        await measure('sql_refresh', () => db.refreshMaterializedView());
+        await bumpIngestVersion(property);
         await this.updateJobStatus(jobId, 'completed', null, totalRowsImported);
       } else {
         logger.info('Skipping materialized view refresh and job status update (SKIP_DB_SAVE=true)');
@@ -212,6 +228,109 @@ class GSCService {
     }
   }
 
+  async enqueueImport(property, start, end, dimensions, searchType, dataState, filters) {
+    if (process.env.SKIP_DB_SAVE) {
+      throw new Error('validation_error: Queued imports require database storage (SKIP_DB_SAVE is set)');
+    }
+
+    const dates = this.listDates(start, end);
+
+    // Estimation avant insertion des unités : sa concurrence recommandée borne les leases du job dès le premier claim.
+    // Le budget mémoire est par processus, la borne est globale au job : choix volontairement prudent
+    const estimation = await importEstimator.estimate(
+      { property, start, end, dimensions, searchType, dataState, filters },
+      { probe: false, dayConcurrency: this.maxLeasesPerProperty }
+    );
+    const jobId = await this.createImportJob(property, start, end, dimensions, searchType, dataState, {
+      maxLeases: estimation.recommendedConcurrency,
+      estimatedRows: estimation.estimatedRows
+    });
+
+    const unitsQueued = await ImportWorkUnit.enqueue(jobId, dates.map(date => ({
+      siteUrl: property,
+      date,
+      dimensions,
+      searchType,
+      dataState,
+      filters
+    })));
+    const unitsSkipped = dates.length - unitsQueued;
+
+    // Jours déjà couverts par un import identique en cours : on renvoie ce(s) job(s) plutôt qu'un faux 'completed'
+    const activeJobIds = unitsSkipped > 0
+      ? await ImportWorkUnit.findActiveJobIds({
+        siteUrl: property,
+        searchType,
+        dataState,
+        scopeKey: ImportWorkUnit.scopeKey(dimensions, filters),
+        start: dates[0],
+        end: dates[dates.length - 1],
+        excludeJobId: jobId
+      })
+      : [];
+
+    if (unitsQueued === 0) {
+      await db.query('DELETE FROM import_jobs WHERE id = $1', [jobId]);
+    }
+
+    logger.info('GSC import queued', {
+      property,
+      jobId,
+      unitsQueued,
+      unitsSkipped,
+      activeJobIds,
+      estimatedRows: estimation.estimatedRows,
+      maxLeases: estimation.recommendedConcurrency
+    });
+
+    return {
+      status: unitsQueued > 0 ? 'queued' : 'already_queued',
+      jobId: unitsQueued > 0 ? jobId : null,
+      unitsQueued,
+      unitsSkipped,
+      activeJobIds,
+      maxLeases: estimation.recommendedConcurrency,
+      estimation,
+      message: unitsSkipped > 0
+        ? `Queued ${unitsQueued} days, ${unitsSkipped} already being imported by job(s) ${activeJobIds.join(', ')}`
+        : `Queued ${unitsQueued} days for import`
+    };
+  }
+
+  async importDay(property, date, dimensions, searchType, dataState, filters) {
+    const dayData = await this.fetchDayData(property, date, dimensions, searchType, dataState, filters);
+    if (dayData.length === 0) return 0;
+
+    const normalizedData = dayData.map(row => ({
+      ...row,
+      pageNormalized: normalizeUrl(row.pageRaw, property)
+    }));
+
+    const insertedRows = await SearchAnalytics.bulkInsert(normalizedData);
+    logger.info(`Imported ${normalizedData.length} rows for ${date}`, { property });
+
+    return insertedRows || normalizedData.length;
+  }
+
+  async getImportJob(jobId) {
+    const result = await db.query('SELECT * FROM import_jobs WHERE id = $1', [jobId]);
+    const job = result.rows[0];
+    if (!job) return null;
+
+    const progress = await ImportWorkUnit.getJobProgress(jobId);
+    return { job, progress };
+  }
+
+  listDates(start, end) {
+    const startDate = new Date(start);
+    const endDate = new Date(end);
+    const dates = [];
+    for (let date = new Date(startDate); date <= endDate; date.setDate(date.getDate() + 1)) {
+      dates.push(date.toISOString().split('T')[0]);
+    }
+    return dates;
+  }
+
   async fetchDayData(property, date, dimensions, searchType, dataState, filters) {
     const authClient = await googleAuth.getAuthenticatedClient();
     const webmasters = google.webmasters({ version: 'v3', auth: authClient });
@@ -246,10 +365,10 @@ class GSCService {
       let response;
       for (let attempt = 1; attempt <= this.maxRetries; attempt++) {
         try {
-          response = await webmasters.searchanalytics.query({
+          response = await measure('google_api', () => webmasters.searchanalytics.query({
             siteUrl: property,
             requestBody
-          });
+          }));
           break;
         } catch (error) {
           if (attempt === this.maxRetries) {
@@ -320,68 +439,12 @@ class GSCService {
     return allRows;
   }
 
-  async estimateRows(property, start, end, dimensions, searchType) {
+  async estimateRows(property, start, end, dimensions, searchType, filters = {}, dataState = 'all') {
     try {
-      const authClient = await googleAuth.getAuthenticatedClient();
-      const webmasters = google.webmasters({ version: 'v3', auth: authClient });
-
-      const startDate = new Date(start);
-      const endDate = new Date(end);
-      const daysDiff = Math.ceil((endDate - startDate) / (1000 * 60 * 60 * 24)) + 1;
-
-      // Sample 3 days to get better estimation
-      const sampleDays = Math.min(3, daysDiff);
-      let totalSampleRows = 0;
-      let sampleCount = 0;
-
-      for (let i = 0; i < sampleDays; i++) {
-        const sampleDate = new Date(startDate);
-        sampleDate.setDate(sampleDate.getDate() + Math.floor(i * daysDiff / sampleDays));
-        const sampleDateStr = sampleDate.toISOString().split('T')[0];
-
-        try {
-          // Get actual row count for sample day with rowLimit 0 (returns metadata only)
-          const response = await webmasters.searchanalytics.query({
-            siteUrl: property,
-            requestBody: {
-              startDate: sampleDateStr,
-              endDate: sampleDateStr,
-              dimensions,
-              rowLimit: 1,
-              searchType
-            }
-          });
-
-          // Try to estimate based on response patterns
-          // Google API doesn't give total counts, so we estimate based on dimensions
-          let estimatedForDay = 1000; // Base estimate
-          
-          // Adjust based on dimensions
-          if (dimensions.includes('query')) estimatedForDay *= 10;
-          if (dimensions.includes('page')) estimatedForDay *= 5;
-          if (dimensions.includes('country')) estimatedForDay *= 2;
-          if (dimensions.includes('device')) estimatedForDay *= 3;
-
-          totalSampleRows += estimatedForDay;
-          sampleCount++;
-          
-          await this.delay(100); // Small delay between samples
-        } catch (sampleError) {
-          logger.warn(`Failed to sample date ${sampleDateStr}`, { error: sampleError.message });
-        }
-      }
-
-      const avgRowsPerDay = sampleCount > 0 ? Math.floor(totalSampleRows / sampleCount) : 5000;
-      const estimatedRows = avgRowsPerDay * daysDiff;
-
-      return {
-        estimatedRows,
-        avgRowsPerDay,
-        dayCount: daysDiff,
-        dimensions,
-        searchType,
-        sampleDays: sampleCount
-      };
+      return await importEstimator.estimate(
+        { property, start, end, dimensions, searchType, dataState, filters },
+        { probe: true, dayConcurrency: this.dayConcurrency }
+      );
     } catch (error) {
       logger.warn('Failed to estimate rows', { error: error.message });
       return {
@@ -393,14 +456,18 @@ class GSCService {
     }
   }
 
-  async createImportJob(property, start, end, dimensions, searchType, dataState) {
+  async createImportJob(property, start, end, dimensions, searchType, dataState, limits = {}) {
     const query = `
-      INSERT INTO import_jobs (site_url, start_date, end_date, dimensions, search_type, data_state, status, started_at)
-      VALUES ($1, $2, $3, $4, $5, $6, 'pending', NOW())
+      INSERT INTO import_jobs (site_url, start_date, end_date, dimensions, search_type, data_state, status, max_leases, estimated_rows, started_at)
+      VALUES ($1, $2, $3, $4, $5, $6, 'pending', $7, $8, NOW())
       RETURNING id
     `;
 
-    const result = await db.query(query, [property, start, end, dimensions, searchType, dataState]);
+    const result = await db.query(query, [
+      property, start, end, dimensions, searchType, dataState,
+      limits.maxLeases || null,
+      Number.isFinite(limits.estimatedRows) ? limits.estimatedRows : null
+    ]);
     return result.rows[0].id;
   }
 
@@ -414,6 +481,75 @@ class GSCService {
     await db.query(query, [jobId, status, errorMessage, rowsImported]);
   }
 
+  async markJobRunning(jobId) {
+    const query = `
+      UPDATE import_jobs SET status = 'running', started_at = NOW()
+      WHERE id = $1 AND status = 'pending'
+    `;
+
+    await db.query(query, [jobId]);
+  }
+
+  async finalizeQueuedJob(jobId) {
+    const progress = await ImportWorkUnit.getJobProgress(jobId);
+    if (progress.pendingUnits + progress.runningUnits > 0) {
+      return false;
+    }
+
+    const status = progress.failedUnits > 0 ? 'failed' : 'completed';
+    const errorMessage = progress.failedUnits > 0 ? `${progress.failedUnits} day(s) failed to import` : null;
+
+    // Vues et version d'ingestion d'abord : si le refresh échoue, le job reste 'running'
+    // et sera refinalisé par finalizeStaleQueuedJobs
+    await db.refreshMaterializedView();
+
+    const job = await db.query('SELECT site_url FROM import_jobs WHERE id = $1', [jobId]);
+    if (job.rows[0]) {
+      await bumpIngestVersion(job.rows[0].site_url);
+    }
+
+    // Plusieurs workers peuvent terminer les dernières unités en même temps : seul le premier finalise
+    const query = `
+      UPDATE import_jobs
+      SET status = $1, error_message = $2, rows_imported = $3, completed_at = NOW()
+      WHERE id = $4 AND status IN ('pending', 'running')
+    `;
+
+    const result = await db.query(query, [status, errorMessage, progress.rowsImported, jobId]);
+    if ((result.rowCount ?? result.rowsAffected) !== 1) {
+      return false;
+    }
+
+    logger.info('Queued GSC import finished', { jobId, status, ...progress });
+    return true;
+  }
+
+  // Jobs dont toutes les unités sont terminées mais jamais finalisés (refresh en échec, worker tué)
+  async finalizeStaleQueuedJobs(limit = 10) {
+    const query = `
+      SELECT j.id FROM import_jobs j
+      WHERE j.status IN ('pending', 'running')
+        AND EXISTS (SELECT 1 FROM import_work_units u WHERE u.job_id = j.id)
+        AND NOT EXISTS (
+          SELECT 1 FROM import_work_units u
+          WHERE u.job_id = j.id AND u.status IN ('pending', 'running')
+        )
+      ORDER BY j.id
+      LIMIT $1
+    `;
+
+    const result = await db.query(query, [limit]);
+    let finalized = 0;
+
+    for (const row of result.rows) {
+      if (await this.finalizeQueuedJob(row.id)) {
+        finalized++;
+      }
+    }
+
+    return finalized;
+  }
+
   handleGoogleAPIError(error) {
     const { code, message } = error;
 
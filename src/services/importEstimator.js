@@ -0,0 +1,319 @@
+const { google } = require('googleapis');
+const googleAuth = require('./googleAuth');
+const { createLogger } = require('../utils/logger');
+
+let db;
+if (!process.env.SKIP_DB_SAVE) {
+  db = require('../config/database');
+}
+
+const logger = createLogger('ImportEstimator');
+
+const ALL_DIMENSIONS = ['page', 'query', 'country', 'device'];
+const DAY_MS = 1000 * 60 * 60 * 24;
+
+// Empreinte mémoire approximative d'une ligne GSC (objet brut + copie normalisée)
+const ROW_BYTES = 450;
+const ROW_COPIES_IN_FLIGHT = 2;
+
+// Coût d'un appel Search Analytics hors pagination, et délai entre pages (cf. fetchDayData)
+const DEFAULT_CALL_MS = 700;
+const PAGE_DELAY_MS = 250;
+const BATCH_DELAY_MS = 1000;
+const DEFAULT_ROWS_PER_DAY = 5000;
+
+const HISTORY_WINDOW_DAYS = 28;
+// Les jobs ne donnent qu'une moyenne par jour : marge pour approcher le pic réel
+const JOB_PEAK_HEADROOM = 1.5;
+
+const PROBE_SAMPLE_DAYS = 3;
+const PROBE_MAX_ROWS = 5000000;
+
+class ImportEstimator {
+  constructor() {
+    this.pageSize = 25000;
+    this.memoryBudgetBytes = (parseInt(process.env.IMPORT_MEMORY_BUDGET_MB) || 512) * 1024 * 1024;
+  }
+
+  async estimate(params, options = {}) {
+    const {
+      property,
+      start,
+      end,
+      dimensions = ALL_DIMENSIONS,
+      searchType = 'web',
+      dataState = 'all',
+      filters = {}
+    } = params;
+    const { probe = true, dayConcurrency = 3, stateless = !!process.env.SKIP_DB_SAVE } = options;
+
+    const dayCount = Math.floor((new Date(end) - new Date(start)) / DAY_MS) + 1;
+
+    // L'historique n'est pas filtré : un import restreint (pays, device, regex) serait surestimé
+    let sample = hasNarrowingFilters(filters)
+      ? null
+      : await this.fromHistory(property, dimensions, searchType, dataState);
+    if (!sample && probe) {
+      sample = await this.fromProbe(property, start, end, dayCount, dimensions, searchType, dataState, filters);
+    }
+    if (!sample) {
+      sample = {
+        source: 'default',
+        avgRowsPerDay: DEFAULT_ROWS_PER_DAY,
+        maxRowsPerDay: DEFAULT_ROWS_PER_DAY,
+        msPerRow: null,
+        sampleDays: 0
+      };
+    }
+
+    const { avgRowsPerDay, maxRowsPerDay } = sample;
+    const estimatedRows = Math.round(avgRowsPerDay * dayCount);
+
+    // fetchDayData pagine jusqu'à une page incomplète : une requête de plus par tranche pleine
+    const callsPerDay = Math.floor(avgRowsPerDay / this.pageSize) + 1;
+    const estimatedApiCalls = callsPerDay * dayCount;
+
+    const dayBytes = maxRowsPerDay * ROW_BYTES * ROW_COPIES_IN_FLIGHT;
+    const recommendedConcurrency = Math.max(1, Math.min(dayConcurrency, Math.floor(this.memoryBudgetBytes / Math.max(dayBytes, 1))));
+    const estimatedPeakMemoryBytes = stateless
+      ? estimatedRows * ROW_BYTES * ROW_COPIES_IN_FLIGHT
+      : recommendedConcurrency * dayBytes;
+
+    let estimatedDurationMs;
+    if (sample.msPerRow) {
+      estimatedDurationMs = Math.round(estimatedRows * sample.msPerRow);
+    } else {
+      const batches = Math.ceil(dayCount / recommendedConcurrency);
+      const dayMs = callsPerDay * DEFAULT_CALL_MS + (callsPerDay - 1) * PAGE_DELAY_MS;
+      estimatedDurationMs = batches * dayMs + Math.max(0, batches - 1) * BATCH_DELAY_MS;
+    }
+
+    return {
+      estimatedRows,
+      avgRowsPerDay: Math.round(avgRowsPerDay),
+      maxRowsPerDay: Math.round(maxRowsPerDay),
+      dayCount,
+      dimensions,
+      searchType,
+      estimatedApiCalls,
+      estimatedDurationMs,
+      estimatedPeakMemoryBytes,
+      recommendedConcurrency,
+      source: sample.source,
+      sampleDays: sample.sampleDays
+    };
+  }
+
+  async fromHistory(property, dimensions, searchType, dataState) {
+    if (!db) return null;
+
+    try {
+      const [dailySample, jobSample] = await Promise.all([
+        this.dailyRowCounts(property, dimensions, searchType, dataState),
+        this.completedJobs(property, dimensions, searchType, dataState)
+      ]);
+
+      if (!dailySample && !jobSample) return null;
+
+      const base = dailySample || jobSample;
+      return {
+        source: 'history',
+        avgRowsPerDay: base.avgRowsPerDay,
+        maxRowsPerDay: base.maxRowsPerDay,
+        msPerRow: jobSample ? jobSample.msPerRow : null,
+        sampleDays: base.sampleDays
+      };
+    } catch (error) {
+      logger.warn('Failed to read import history', { error: error.message, property });
+      return null;
+    }
+  }
+
+  async dailyRowCounts(property, dimensions, searchType, dataState) {
+    // Les lignes stockées portent toujours les 4 dimensions : comptage valable seulement dans ce cas
+    if (!ALL_DIMENSIONS.every(d => dimensions.includes(d))) return null;
+
+    // MAX(date) passe par l'index (site_url, date) ; le comptage ne parcourt ensuite que la fenêtre
+    const latest = await db.query(
+      'SELECT MAX(date) as last_date FROM gsc_search_analytics WHERE site_url = $1',
+      [property]
+    );
+    const lastDate = latest.rows[0] && latest.rows[0].last_date;
+    if (!lastDate) return null;
+
+    const windowStart = new Date(toDateString(lastDate));
+    windowStart.setUTCDate(windowStart.getUTCDate() - (HISTORY_WINDOW_DAYS - 1));
+
+    const query = `
+      SELECT date, COUNT(*) as row_count
+      FROM gsc_search_analytics
+      WHERE site_url = $1 AND date >= $2 AND search_type = $3 AND data_state = $4
+      GROUP BY date
+    `;
+
+    const result = await db.query(query, [property, windowStart.toISOString().split('T')[0], searchType, dataState]);
+    const counts = result.rows.map(row => parseInt(row.row_count)).filter(count => count > 0);
+    if (counts.length === 0) return null;
+
+    return {
+      avgRowsPerDay: counts.reduce((sum, count) => sum + count, 0) / counts.length,
+      maxRowsPerDay: Math.max(...counts),
+      sampleDays: counts.length
+    };
+  }
+
+  async completedJobs(property, dimensions, searchType, dataState) {
+    const query = `
+      SELECT start_date, end_date, dimensions, rows_imported, started_at, completed_at
+      FROM import_jobs
+      WHERE site_url = $1 AND search_type = $2 AND data_state = $3 AND status = 'completed' AND rows_imported > 0
+      ORDER BY completed_at DESC
+      LIMIT 20
+    `;
+
+    const result = await db.query(query, [property, searchType, dataState]);
+    const wanted = dimensionsKey(dimensions);
+    const jobs = result.rows.filter(job => dimensionsKey(job.dimensions) === wanted);
+    if (jobs.length === 0) return null;
+
+    let totalRows = 0;
+    let totalDays = 0;
+    let peakJobAvgRowsPerDay = 0;
+    let timedRows = 0;
+    let timedMs = 0;
+
+    for (const job of jobs) {
+      const days = Math.floor((new Date(job.end_date) - new Date(job.start_date)) / DAY_MS) + 1;
+      const rows = parseInt(job.rows_imported);
+      totalRows += rows;
+      totalDays += days;
+      peakJobAvgRowsPerDay = Math.max(peakJobAvgRowsPerDay, rows / days);
+
+      const durationMs = new Date(job.completed_at) - new Date(job.started_at);
+      if (durationMs > 0) {
+        timedRows += rows;
+        timedMs += durationMs;
+      }
+    }
+
+    return {
+      avgRowsPerDay: totalRows / totalDays,
+      maxRowsPerDay: peakJobAvgRowsPerDay * JOB_PEAK_HEADROOM,
+      msPerRow: timedRows > 0 ? timedMs / timedRows : null,
+      sampleDays: totalDays
+    };
+  }
+
+  async fromProbe(property, start, end, dayCount, dimensions, searchType, dataState, filters) {
+    try {
+      const authClient = await googleAuth.getAuthenticatedClient();
+      const webmasters = google.webmasters({ version: 'v3', auth: authClient });
+
+      const sampleDays = Math.min(PROBE_SAMPLE_DAYS, dayCount);
+      const counts = [];
+
+      for (let i = 0; i < sampleDays; i++) {
+        const sampleDate = new Date(start);
+        sampleDate.setDate(sampleDate.getDate() + Math.floor(i * dayCount / sampleDays));
+        const sampleDateStr = sampleDate.toISOString().split('T')[0];
+
+        try {
+          counts.push(await this.probeDayRows(webmasters, property, sampleDateStr, dimensions, searchType, dataState, filters));
+        } catch (sampleError) {
+          logger.warn(`Failed to probe date ${sampleDateStr}`, { error: sampleError.message });
+        }
+      }
+
+      if (counts.length === 0) return null;
+
+      return {
+        source: 'probe',
+        avgRowsPerDay: counts.reduce((sum, count) => sum + count, 0) / counts.length,
+        maxRowsPerDay: Math.max(...counts),
+        msPerRow: null,
+        sampleDays: counts.length
+      };
+    } catch (error) {
+      logger.warn('Failed to probe GSC row counts', { error: error.message, property });
+      return null;
+    }
+  }
+
+  // L'API ne renvoie pas de total : on cherche la dernière ligne existante par startRow
+  // avec rowLimit 1 (recherche exponentielle puis dichotomie à ~5% près)
+  async probeDayRows(webmasters, property, date, dimensions, searchType, dataState, filters) {
+    const hasRowAt = async (startRow) => {
+      const requestBody = {
+        startDate: date,
+        endDate: date,
+        dimensions,
+        rowLimit: 1,
+        startRow,
+        searchType,
+        dataState
+      };
+      const dimensionFilterGroups = buildDimensionFilterGroups(filters);
+      if (dimensionFilterGroups) requestBody.dimensionFilterGroups = dimensionFilterGroups;
+
+      const response = await webmasters.searchanalytics.query({ siteUrl: property, requestBody });
+      return (response.data.rows || []).length > 0;
+    };
+
+    if (!await hasRowAt(0)) return 0;
+
+    let low = 0;
+    let high = 1000;
+    while (await hasRowAt(high)) {
+      low = high;
+      if (high >= PROBE_MAX_ROWS) return high;
+      high *= 4;
+    }
+
+    while (high - low > Math.max(100, low * 0.05)) {
+      const mid = Math.floor((low + high) / 2);
+      if (await hasRowAt(mid)) {
+        low = mid;
+      } else {
+        high = mid;
+      }
+    }
+
+    return Math.round((low + high) / 2);
+  }
+}
+
+function buildDimensionFilterGroups(filters = {}) {
+  if (!filters.country) return null;
+
+  return [{
+    filters: [{
+      dimension: 'country',
+      operator: 'equals',
+      expression: filters.country
+    }]
+  }];
+}
+
+function hasNarrowingFilters(filters = {}) {
+  return Boolean(filters.country || filters.device || filters.pageRegex);
+}
+
+function toDateString(value) {
+  if (value instanceof Date) {
+    // pg renvoie les colonnes DATE à minuit heure locale
+    const month = String(value.getMonth() + 1).padStart(2, '0');
+    const day = String(value.getDate()).padStart(2, '0');
+    return `${value.getFullYear()}-${month}-${day}`;
+  }
+  return String(value).slice(0, 10);
+}
+
+function dimensionsKey(dimensions) {
+  // TEXT[] côté PostgreSQL, chaîne "{a,b}" ou "a,b" côté SQLite
+  const list = Array.isArray(dimensions)
+    ? dimensions
+    : String(dimensions || '').replace(/[{}"[\]]/g, '').split(',');
+  return list.map(d => d.trim()).filter(Boolean).sort().join(',');
+}
+
+module.exports = new ImportEstimator();
@@ -0,0 +1,171 @@
+const os = require('os');
+const { v4: uuidv4 } = require('uuid');
+const ImportWorkUnit = require('../models/ImportWorkUnit');
+const gscService = require('./gscService');
+const { createLogger } = require('../utils/logger');
+
+const logger = createLogger('ImportWorker');
+
+const MAX_SLOT_BACKOFF_MS = 60000;
+
+class ImportWorker {
+  constructor(options = {}) {
+    this.workerId = options.workerId || `${os.hostname()}:${process.pid}:${uuidv4().slice(0, 8)}`;
+    this.concurrency = options.concurrency || parseInt(process.env.IMPORT_WORKER_CONCURRENCY) || 3;
+    this.leaseMs = options.leaseMs || parseInt(process.env.IMPORT_LEASE_MS) || 120000;
+    this.heartbeatMs = Math.floor(this.leaseMs / 3);
+    this.pollIntervalMs = options.pollIntervalMs || parseInt(process.env.IMPORT_POLL_INTERVAL_MS) || 2000;
+    this.maxPerProperty = options.maxPerProperty || parseInt(process.env.IMPORT_MAX_LEASES_PER_PROPERTY) || 3;
+    this.maxAttempts = options.maxAttempts || parseInt(process.env.IMPORT_MAX_UNIT_ATTEMPTS) || 5;
+    this.retryDelay = parseInt(process.env.RETRY_DELAY_MS) || 1000;
+    this.finalizeSweepMs = options.finalizeSweepMs || parseInt(process.env.IMPORT_FINALIZE_SWEEP_MS) || 60000;
+    this.lastFinalizeSweep = 0;
+    this.running = false;
+    this.slots = [];
+  }
+
+  start() {
+    if (this.running) return;
+
+    this.running = true;
+    this.slots = Array.from({ length: this.concurrency }, (_, slot) => this.runSlot(slot));
+
+    logger.info('Import worker started', {
+      workerId: this.workerId,
+      concurrency: this.concurrency,
+      leaseMs: this.leaseMs,
+      maxPerProperty: this.maxPerProperty
+    });
+  }
+
+  async stop() {
+    this.running = false;
+    await Promise.all(this.slots);
+    logger.info('Import worker stopped', { workerId: this.workerId });
+  }
+
+  async runSlot(slot) {
+    let consecutiveErrors = 0;
+
+    while (this.running) {
+      try {
+        const unit = await ImportWorkUnit.claim(this.workerId, {
+          leaseMs: this.leaseMs,
+          maxPerProperty: this.maxPerProperty
+        });
+
+        if (!unit) {
+          consecutiveErrors = 0;
+          await this.sweepUnfinalizedJobs();
+          await gscService.delay(this.pollIntervalMs + Math.random() * this.pollIntervalMs);
+          continue;
+        }
+
+        const backoff = await this.processUnit(unit);
+        consecutiveErrors = 0;
+
+        if (backoff > 0) {
+          await gscService.delay(backoff);
+        }
+      } catch (error) {
+        // Erreur de base transitoire : le slot survit, l'unité en cours sera reprise à l'expiration du lease
+        consecutiveErrors++;
+        const backoff = Math.min(this.retryDelay * Math.pow(2, consecutiveErrors), MAX_SLOT_BACKOFF_MS);
+        logger.error(`Import worker slot error, retrying in ${backoff}ms`, { slot, error: error.message, consecutiveErrors });
+        await gscService.delay(backoff);
+      }
+    }
+  }
+
+  async processUnit(unit) {
+    const context = { unitId: unit.id, jobId: unit.job_id, property: unit.site_url, date: unit.date, attempt: unit.attempts };
+
+    // Lease expiré trop de fois (worker tué en cours de traitement)
+    if (unit.attempts > this.maxAttempts) {
+      logger.error('Import work unit exceeded max attempts', context);
+      await ImportWorkUnit.fail(unit.id, this.workerId, unit.error_message || 'max_attempts_exceeded: lease expired repeatedly');
+      await this.finalizeJob(unit.job_id);
+      return 0;
+    }
+
+    await gscService.markJobRunning(unit.job_id);
+
+    const heartbeat = setInterval(async () => {
+      try {
+        const renewed = await ImportWorkUnit.heartbeat(unit.id, this.workerId, this.leaseMs);
+        if (!renewed) {
+          logger.warn('Lost lease on import work unit', context);
+        }
+      } catch (error) {
+        logger.warn('Import work unit heartbeat failed', { ...context, error: error.message });
+      }
+    }, this.heartbeatMs);
+
+    let rowsImported = 0;
+    let importError = null;
+
+    try {
+      logger.info('Processing import work unit', context);
+
+      rowsImported = await gscService.importDay(
+        unit.site_url,
+        unit.date,
+        unit.dimensions,
+        unit.search_type,
+        unit.data_state,
+        unit.filters
+      );
+    } catch (error) {
+      importError = error;
+    } finally {
+      clearInterval(heartbeat);
+    }
+
+    // Seul l'échec de l'import décide du sort de l'unité : une erreur de bookkeeping remonte au slot
+    let backoff = 0;
+
+    if (!importError) {
+      const completed = await ImportWorkUnit.complete(unit.id, this.workerId, rowsImported);
+      if (!completed) {
+        logger.warn('Import work unit completed after its lease was taken over', context);
+      }
+    } else {
+      const message = importError.message || 'Unknown error';
+      const retryable = message.includes('rate_limited') || message.includes('google_api_unavailable');
+
+      if (retryable && unit.attempts < this.maxAttempts) {
+        // Quota Google atteint : on rend l'unité et on ralentit ce slot
+        backoff = this.retryDelay * Math.pow(2, unit.attempts) + Math.random() * 1000;
+        logger.warn(`Import work unit throttled, retrying in ${Math.round(backoff)}ms`, { ...context, error: message });
+        await ImportWorkUnit.release(unit.id, this.workerId, message, backoff);
+      } else {
+        logger.error('Import work unit failed', { ...context, error: message });
+        await ImportWorkUnit.fail(unit.id, this.workerId, message);
+      }
+    }
+
+    await this.finalizeJob(unit.job_id);
+    return backoff;
+  }
+
+  // Un slot inactif rattrape au plus une fois par intervalle les finalisations échouées
+  async sweepUnfinalizedJobs() {
+    if (Date.now() - this.lastFinalizeSweep < this.finalizeSweepMs) return;
+    this.lastFinalizeSweep = Date.now();
+
+    const finalized = await gscService.finalizeStaleQueuedJobs();
+    if (finalized > 0) {
+      logger.info('Finalized stale import jobs', { finalized, workerId: this.workerId });
+    }
+  }
+
+  async finalizeJob(jobId) {
+    try {
+      await gscService.finalizeQueuedJob(jobId);
+    } catch (error) {
+      logger.error('Failed to finalize import job', { jobId, error: error.message });
+    }
+  }
+}
+
+module.exports = ImportWorker;
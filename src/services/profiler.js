@@ -0,0 +1,80 @@
+const inspector = require('inspector');
+const fs = require('fs');
+const path = require('path');
+const { createLogger } = require('../utils/logger');
+
+const logger = createLogger('Profiler');
+
+const MAX_CPU_PROFILE_MS = 120000;
+
+class Profiler {
+  constructor() {
+    this.outputDir = process.env.PROFILE_DIR || path.join(__dirname, '../../logs/profiles');
+    this.busy = false;
+  }
+
+  // Une seule capture à la fois : le profiler V8 est global au processus
+  async exclusive(kind, capture) {
+    if (this.busy) {
+      throw new Error('profile_in_progress: Another profile capture is already running');
+    }
+
+    this.busy = true;
+    const session = new inspector.Session();
+    session.connect();
+
+    const post = (method, params = {}) => new Promise((resolve, reject) => {
+      session.post(method, params, (error, result) => (error ? reject(error) : resolve(result)));
+    });
+
+    try {
+      fs.mkdirSync(this.outputDir, { recursive: true });
+      const file = path.join(this.outputDir, `${kind}-${process.pid}-${Date.now()}.${kind === 'cpu' ? 'cpuprofile' : 'heapsnapshot'}`);
+
+      await capture(session, post, file);
+
+      const { size } = fs.statSync(file);
+      logger.info('Profile captured', { kind, file, bytes: size });
+      return { kind, file, bytes: size, pid: process.pid };
+    } finally {
+      session.disconnect();
+      this.busy = false;
+    }
+  }
+
+  async captureCpuProfile(durationMs) {
+    const duration = Math.min(Math.max(durationMs, 1000), MAX_CPU_PROFILE_MS);
+
+    return this.exclusive('cpu', async (session, post, file) => {
+      logger.info('Starting CPU profile', { durationMs: duration, pid: process.pid });
+
+      await post('Profiler.enable');
+      await post('Profiler.start');
+      await new Promise(resolve => setTimeout(resolve, duration));
+      const { profile } = await post('Profiler.stop');
+      await post('Profiler.disable');
+
+      fs.writeFileSync(file, JSON.stringify(profile));
+    });
+  }
+
+  // Bloque le processus pendant la capture (proportionnel à la taille du heap)
+  async captureHeapSnapshot() {
+    return this.exclusive('heap', async (session, post, file) => {
+      logger.warn('Taking heap snapshot, the process will pause', { pid: process.pid, heapUsed: process.memoryUsage().heapUsed });
+
+      const fd = fs.openSync(file, 'w');
+      const onChunk = (message) => fs.writeSync(fd, message.params.chunk);
+
+      session.on('HeapProfiler.addHeapSnapshotChunk', onChunk);
+      try {
+        await post('HeapProfiler.takeHeapSnapshot', { reportProgress: false });
+      } finally {
+        session.removeListener('HeapProfiler.addHeapSnapshotChunk', onChunk);
+        fs.closeSync(fd);
+      }
+    });
+  }
+}
+
+module.exports = new Profiler();
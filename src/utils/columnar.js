@@ -0,0 +1,19 @@
+// Layout compact "columns" : un tableau par champ au lieu d'un tableau d'objets
+const toColumns = (rows, fields) => {
+  const columns = {};
+  for (const field of fields) {
+    columns[field] = new Array(rows.length);
+  }
+
+  rows.forEach((row, index) => {
+    for (const field of fields) {
+      columns[field][index] = row[field];
+    }
+  });
+
+  return columns;
+};
+
+module.exports = {
+  toColumns
+};
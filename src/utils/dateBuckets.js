@@ -0,0 +1,76 @@
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+const toUtcDay = (value) => {
+  const date = value instanceof Date ? value : new Date(value);
+  return Date.UTC(date.getUTCFullYear(), date.getUTCMonth(), date.getUTCDate());
+};
+
+const toIsoDate = (time) => new Date(time).toISOString().split('T')[0];
+
+// Début du bucket contenant le jour (semaine ISO = lundi, comme date_trunc('week'))
+const bucketStart = (time, unit) => {
+  const date = new Date(time);
+  if (unit === 'month') {
+    return Date.UTC(date.getUTCFullYear(), date.getUTCMonth(), 1);
+  }
+  const weekday = (date.getUTCDay() + 6) % 7;
+  return time - weekday * DAY_MS;
+};
+
+const nextBucket = (time, unit) => {
+  const date = new Date(time);
+  if (unit === 'month') {
+    return Date.UTC(date.getUTCFullYear(), date.getUTCMonth() + 1, 1);
+  }
+  return time + 7 * DAY_MS;
+};
+
+// Extrait de [from, to] les buckets entièrement couverts et renvoie les morceaux restants
+const carve = (from, to, unit, out) => {
+  let first = bucketStart(from, unit);
+  if (first < from) {
+    first = nextBucket(first, unit);
+  }
+
+  let cursor = first;
+  while (nextBucket(cursor, unit) - DAY_MS <= to) {
+    out.push(toIsoDate(cursor));
+    cursor = nextBucket(cursor, unit);
+  }
+
+  if (cursor === first) {
+    return [[from, to]];
+  }
+
+  const leftovers = [];
+  if (first > from) leftovers.push([from, first - DAY_MS]);
+  if (cursor <= to) leftovers.push([cursor, to]);
+  return leftovers;
+};
+
+/**
+ * Découpe [start, end] en mois entiers, puis semaines entières, puis jours restants.
+ * `units` choisit les niveaux utilisables (ex: ['week'] pour une série hebdomadaire).
+ */
+const planBuckets = (start, end, units = ['month', 'week']) => {
+  const plan = { month: [], week: [], day: [] };
+  let pieces = [[toUtcDay(start), toUtcDay(end)]];
+
+  for (const unit of ['month', 'week']) {
+    if (units.includes(unit)) {
+      pieces = pieces.flatMap(([from, to]) => carve(from, to, unit, plan[unit]));
+    }
+  }
+
+  for (const [from, to] of pieces) {
+    for (let time = from; time <= to; time += DAY_MS) {
+      plan.day.push(toIsoDate(time));
+    }
+  }
+
+  return plan;
+};
+
+module.exports = {
+  planBuckets
+};
@@ -0,0 +1,80 @@
+const { AsyncLocalStorage } = require('async_hooks');
+
+const storage = new AsyncLocalStorage();
+
+const now = () => Number(process.hrtime.bigint()) / 1e6;
+
+// Durées cumulées par phase pour une requête (validation, cache, sql_*, map, serialize...)
+class RequestTiming {
+  constructor() {
+    this.startedAt = now();
+    this.phases = new Map();
+  }
+
+  add(name, duration) {
+    const phase = this.phases.get(name) || { duration: 0, count: 0 };
+    phase.duration += duration;
+    phase.count += 1;
+    this.phases.set(name, phase);
+  }
+
+  elapsed() {
+    return now() - this.startedAt;
+  }
+
+  toJSON() {
+    const phases = {};
+    for (const [name, { duration }] of this.phases) {
+      phases[name] = Math.round(duration * 10) / 10;
+    }
+    return phases;
+  }
+
+  toServerTiming() {
+    const entries = [];
+    for (const [name, { duration, count }] of this.phases) {
+      const desc = count > 1 ? `;desc="x${count}"` : '';
+      entries.push(`${name};dur=${duration.toFixed(1)}${desc}`);
+    }
+    entries.push(`total;dur=${this.elapsed().toFixed(1)}`);
+    return entries.join(', ');
+  }
+}
+
+const currentTiming = () => storage.getStore();
+
+const runWithTiming = (timing, fn) => storage.run(timing, fn);
+
+// Hors requête (worker, scripts) il n'y a pas de contexte : simple appel
+const measure = async (name, fn) => {
+  const timing = currentTiming();
+  if (!timing) return fn();
+
+  const start = now();
+  try {
+    return await fn();
+  } finally {
+    timing.add(name, now() - start);
+  }
+};
+
+const measureSync = (name, fn) => {
+  const timing = currentTiming();
+  if (!timing) return fn();
+
+  const start = now();
+  try {
+    return fn();
+  } finally {
+    timing.add(name, now() - start);
+  }
+};
+
+module.exports = {
+  RequestTiming,
+  currentTiming,
+  runWithTiming,
+  measure,
+  measureSync,
+  now
+};
@@ -0,0 +1,93 @@
+const cluster = require('cluster');
+require('dotenv').config();
+
+const db = require('./config/database');
+const redisClient = require('./config/redis');
+const ImportWorker = require('./services/importWorker');
+const profiler = require('./services/profiler');
+const { createLogger } = require('./utils/logger');
+
+const logger = createLogger('Worker');
+
+const processCount = parseInt(process.env.IMPORT_WORKER_PROCESSES) || 1;
+
+// Pas d'endpoint HTTP côté worker : USR2 = profil CPU, TTIN = snapshot mémoire (SIGUSR1 est réservé à l'inspecteur Node)
+const PROFILE_SIGNALS = ['SIGUSR2', 'SIGTTIN'];
+
+async function runWorker() {
+  // Redis sert à publier la version d'ingestion (ETag) à la fin des imports
+  if (process.env.REDIS_HOST && process.env.SKIP_REDIS !== 'true') {
+    await redisClient.connect();
+  }
+
+  const worker = new ImportWorker();
+
+  const shutdown = async (signal) => {
+    logger.info(`Received ${signal}, draining import worker...`);
+    await worker.stop();
+    await db.close();
+    await redisClient.close();
+    process.exit(0);
+  };
+
+  process.on('SIGTERM', shutdown);
+  process.on('SIGINT', shutdown);
+
+  // Les slots gèrent leurs erreurs : un rejet non géré ici ne doit pas tuer un worker seul (sans primary)
+  process.on('unhandledRejection', (reason) => {
+    logger.error('Unhandled promise rejection in import worker', { reason: reason && reason.message ? reason.message : String(reason) });
+  });
+
+  // Fichiers écrits dans PROFILE_DIR
+  process.on('SIGUSR2', () => {
+    const durationMs = (parseInt(process.env.PROFILE_SIGNAL_DURATION_S) || 30) * 1000;
+    profiler.captureCpuProfile(durationMs)
+      .then(({ file }) => logger.info('CPU profile written', { file }))
+      .catch((error) => logger.warn('CPU profile capture failed', { error: error.message }));
+  });
+
+  process.on('SIGTTIN', () => {
+    profiler.captureHeapSnapshot()
+      .then(({ file }) => logger.info('Heap snapshot written', { file }))
+      .catch((error) => logger.warn('Heap snapshot failed', { error: error.message }));
+  });
+
+  worker.start();
+}
+
+if (cluster.isPrimary && processCount > 1) {
+  logger.info(`Starting ${processCount} import worker processes`);
+
+  for (let i = 0; i < processCount; i++) {
+    cluster.fork();
+  }
+
+  cluster.on('exit', (child, code, signal) => {
+    if (signal === 'SIGTERM' || signal === 'SIGINT' || code === 0) return;
+
+    // Les unités du worker mort seront reprises à l'expiration de leur lease
+    logger.warn('Import worker process died, restarting', { pid: child.process.pid, code, signal });
+    cluster.fork();
+  });
+
+  const signalChildren = (signal) => {
+    for (const child of Object.values(cluster.workers)) {
+      child.process.kill(signal);
+    }
+  };
+  process.on('SIGTERM', () => signalChildren('SIGTERM'));
+  process.on('SIGINT', () => signalChildren('SIGINT'));
+
+  // L'action par défaut de ces signaux arrêterait le primary (et donc tous les workers) : on les relaie
+  for (const signal of PROFILE_SIGNALS) {
+    process.on(signal, () => {
+      logger.info(`Forwarding ${signal} to import worker processes`);
+      signalChildren(signal);
+    });
+  }
+} else {
+  runWorker().catch((error) => {
+    logger.error('Import worker crashed', { error: error.message, stack: error.stack });
+    process.exit(1);
+  });
+}
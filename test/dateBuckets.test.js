@@ -0,0 +1,81 @@
+const { planBuckets } = require('../src/utils/dateBuckets');
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+const daysBetween = (start, end) => {
+  const days = [];
+  for (let time = Date.parse(start); time <= Date.parse(end); time += DAY_MS) {
+    days.push(new Date(time).toISOString().split('T')[0]);
+  }
+  return days;
+};
+
+// Déplie chaque bucket en jours : month -> jours du mois, week -> 7 jours, day -> lui-même
+const expand = (plan) => {
+  const days = [];
+
+  for (const monthStart of plan.month) {
+    const date = new Date(`${monthStart}T00:00:00Z`);
+    const monthEnd = new Date(Date.UTC(date.getUTCFullYear(), date.getUTCMonth() + 1, 0));
+    days.push(...daysBetween(monthStart, monthEnd.toISOString().split('T')[0]));
+  }
+
+  for (const weekStart of plan.week) {
+    const weekEnd = new Date(Date.parse(weekStart) + 6 * DAY_MS).toISOString().split('T')[0];
+    days.push(...daysBetween(weekStart, weekEnd));
+  }
+
+  days.push(...plan.day);
+  return days;
+};
+
+const expectExactCover = (plan, start, end) => {
+  const covered = expand(plan);
+
+  // Aucun jour compté deux fois
+  expect(new Set(covered).size).toBe(covered.length);
+  // Aucun trou ni débordement
+  expect([...covered].sort()).toEqual(daysBetween(start, end));
+};
+
+describe('planBuckets', () => {
+  test('covers a range with a partial month on both ends', () => {
+    const plan = planBuckets('2025-01-15', '2025-04-10');
+
+    expect(plan.month).toEqual(['2025-02-01', '2025-03-01']);
+    // Semaines du 27/01 et du 31/03 à cheval sur un mois déjà pris, celle du 07/04 dépasse la fin : restent en jours
+    expect(plan.week).toEqual(['2025-01-20']);
+    expect(plan.day).toEqual([
+      ...daysBetween('2025-01-15', '2025-01-19'),
+      ...daysBetween('2025-01-27', '2025-01-31'),
+      ...daysBetween('2025-04-01', '2025-04-10')
+    ]);
+    expectExactCover(plan, '2025-01-15', '2025-04-10');
+  });
+
+  test('covers a range starting mid-week', () => {
+    // 2025-07-02 est un mercredi, 2025-07-20 un dimanche
+    const plan = planBuckets('2025-07-02', '2025-07-20');
+
+    expect(plan.month).toEqual([]);
+    expect(plan.week).toEqual(['2025-07-07', '2025-07-14']);
+    expect(plan.day).toEqual(daysBetween('2025-07-02', '2025-07-06'));
+    expectExactCover(plan, '2025-07-02', '2025-07-20');
+  });
+
+  test('returns a single bucket for an exact ISO week', () => {
+    const plan = planBuckets('2025-07-07', '2025-07-13');
+
+    expect(plan).toEqual({ month: [], week: ['2025-07-07'], day: [] });
+  });
+
+  test('only uses weeks and days when units is ["week"]', () => {
+    const plan = planBuckets('2025-01-15', '2025-04-10', ['week']);
+
+    expect(plan.month).toEqual([]);
+    expect(plan.week[0]).toBe('2025-01-20');
+    expect(plan.week[plan.week.length - 1]).toBe('2025-03-31');
+    expect(plan.day).toEqual([...daysBetween('2025-01-15', '2025-01-19'), ...daysBetween('2025-04-07', '2025-04-10')]);
+    expectExactCover(plan, '2025-01-15', '2025-04-10');
+  });
+});